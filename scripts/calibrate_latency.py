@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Find the lowest safe blocksize and latency for an audio device.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.midi_sound_player import LatencyCalibrator, save_calibration
+from src.midi_sound_player.effects import ConvolutionReverb
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate blocksize and latency')
+    parser.add_argument('--device', type=int,
+                       help='Output device ID (default: system default)')
+    parser.add_argument('--null', action='store_true',
+                       help='Measure against a null backend instead of the device')
+    parser.add_argument('--voices', type=int, default=32,
+                       help='Number of voices in the synthetic load (default: 32)')
+    parser.add_argument('--sound', type=str,
+                       help='Sound file used for the voices (default: noise)')
+    parser.add_argument('--headroom', type=float, default=0.5,
+                       help='Maximum fraction of the deadline per callback (default: 0.5)')
+    parser.add_argument('--duration', type=float, default=2.0,
+                       help='Seconds to measure each setting (default: 2)')
+    parser.add_argument('--reverb', type=str,
+                       help='Impulse response loaded as a channel reverb during the measurement')
+    parser.add_argument('--config', type=str,
+                       help='Calibration file (default: ~/.config/midi_sound_player/calibration.json)')
+    args = parser.parse_args()
+
+    channel_effects = None
+    if args.reverb:
+        channel_effects = lambda sample_rate: [ConvolutionReverb.from_file(args.reverb, sample_rate)]
+
+    calibrator = LatencyCalibrator(
+        device=args.device,
+        voices=args.voices,
+        sound_file=args.sound,
+        null_backend=args.null,
+        headroom=args.headroom,
+        duration=args.duration,
+        channel_effects=channel_effects
+    )
+    calibration = calibrator.run()
+
+    for stats in calibrator.results:
+        print(f"blocksize={stats['blocksize']:5d} latency={str(stats['latency']):<5} "
+              f"p{calibrator.percentile:g} load={stats['percentile_load']:.2f} "
+              f"peak load={stats['peak_load']:.2f} underflows={stats['underflows']} "
+              f"{'OK' if stats['passed'] else 'FAIL'}")
+
+    if calibration is None:
+        print("No setting passed; try fewer voices or a larger headroom.")
+        sys.exit(1)
+
+    save_calibration(calibration, args.config)
+    print(f"\nSaved for '{calibration['device']}': blocksize={calibration['blocksize']}, "
+          f"latency={calibration['latency']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Compile a sounds directory and channel configuration into a sample bank.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.midi_sound_player import SoundLibrary, compile_bank
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile a sample bank')
+    parser.add_argument('bank', type=str,
+                       help='Output bank file')
+    parser.add_argument('--sounds', type=str, required=True,
+                       help='Directory containing sound files')
+    parser.add_argument('--config', type=str,
+                       help='Configuration file (optional)')
+    parser.add_argument('--sample-rate', type=int, default=44100,
+                       help='Sample rate of the bank (default: 44100)')
+    parser.add_argument('--notes', type=int, nargs=2, metavar=('LOW', 'HIGH'),
+                       help='Precompute pitched variants for this MIDI note range')
+    parser.add_argument('--pitch-mode', type=str, default='resample',
+                       choices=['resample', 'phase_vocoder'],
+                       help='How variants are pitched (default: resample)')
+    args = parser.parse_args()
+
+    sound_lib = SoundLibrary(args.sounds)
+    if args.config and Path(args.config).exists():
+        sound_lib.load_configuration(args.config)
+
+    notes = range(args.notes[0], args.notes[1] + 1) if args.notes else None
+    index = compile_bank(sound_lib, args.bank, sample_rate=args.sample_rate, notes=notes,
+                         pitch_mode=args.pitch_mode)
+
+    variants = sum(len(entry['variants']) for entry in index['sounds'].values())
+    print(f"Compiled {len(index['sounds'])} sounds and {variants} pitched variants into {args.bank}")
+
+if __name__ == "__main__":
+    main()
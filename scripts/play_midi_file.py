@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Play a Standard MIDI File through the MIDI sound player.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.midi_sound_player import MidiListener, SoundLibrary, Sequencer
+
+def main():
+    parser = argparse.ArgumentParser(description='Play a MIDI file through the sound player')
+    parser.add_argument('midi_file', type=str,
+                       help='Standard MIDI File to play')
+    parser.add_argument('--sounds', type=str, required=True,
+                       help='Directory containing sound files')
+    parser.add_argument('--config', type=str,
+                       help='Configuration file (optional)')
+    parser.add_argument('--start', type=float, default=0.0,
+                       help='Start position in seconds (default: 0)')
+    parser.add_argument('--loop', type=float, nargs=2, metavar=('START', 'END'),
+                       help='Loop between two positions in seconds')
+    args = parser.parse_args()
+
+    sound_lib = SoundLibrary(args.sounds)
+    if args.config and Path(args.config).exists():
+        sound_lib.load_configuration(args.config)
+
+    # Without a configuration, play every channel with the first sound
+    if not sound_lib.channel_sounds:
+        available = sound_lib.get_available_sounds()
+        if not available:
+            print("No sounds found.")
+            return
+        for channel in range(16):
+            sound_lib.assign_sound_to_channel(channel, available[0])
+
+    midi_listener = MidiListener(sound_lib, port=None)
+    sequencer = Sequencer.from_midi_file(midi_listener, args.midi_file)
+    print(f"Loaded {len(sequencer.events)} events ({sequencer.duration:.1f}s)")
+
+    if args.loop:
+        sequencer.set_loop(*args.loop)
+    sequencer.seek(args.start)
+
+    print("Playing. Press Ctrl+C to stop")
+    try:
+        sequencer.play()
+        sequencer.wait()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        sequencer.close()
+        midi_listener.close()
+        midi_listener.sound_player.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Soak test the MIDI sound player with a virtual MIDI source and no audio device.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.midi_sound_player import SoundLibrary, SoakTest, load_midi_events
+from src.midi_sound_player.soak import chord_storm, trill_storm, cc_sweep_storm, mixed_storm
+
+STORMS = {
+    'chords': chord_storm,
+    'trills': trill_storm,
+    'cc': cc_sweep_storm,
+    'mixed': mixed_storm
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak test with a virtual MIDI source')
+    parser.add_argument('--sounds', type=str, required=True,
+                       help='Directory containing sound files')
+    parser.add_argument('--config', type=str,
+                       help='Configuration file (optional)')
+    parser.add_argument('--midi-file', type=str,
+                       help='Replay a MIDI file instead of a synthetic storm')
+    parser.add_argument('--storm', type=str, default='mixed', choices=sorted(STORMS),
+                       help='Synthetic storm to replay (default: mixed)')
+    parser.add_argument('--duration', type=float, default=30.0,
+                       help='Storm duration in seconds (default: 30)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                       help='Replay speed, e.g. 1 to 50 (default: 1)')
+    parser.add_argument('--blocksize', type=int, default=512,
+                       help='Audio block size (default: 512)')
+    parser.add_argument('--warmup', type=float, default=None,
+                       help='Seconds before the memory baseline is taken (default: half the run)')
+    parser.add_argument('--max-dropped', type=int, default=0)
+    parser.add_argument('--max-late', type=int, default=0)
+    parser.add_argument('--max-errors', type=int, default=0)
+    parser.add_argument('--max-timer-lag', type=float, default=20.0,
+                       help='Maximum delay of an event reaching the input queue in ms (default: 20)')
+    parser.add_argument('--max-overruns', type=int, default=None,
+                       help='Fail on more slow callbacks than this (default: not checked)')
+    parser.add_argument('--max-underflows', type=int, default=0)
+    parser.add_argument('--max-memory-growth', type=float, default=64.0,
+                       help='Maximum RSS growth in MB (default: 64)')
+    args = parser.parse_args()
+
+    sound_lib = SoundLibrary(args.sounds)
+    if args.config and Path(args.config).exists():
+        sound_lib.load_configuration(args.config)
+    if not sound_lib.channel_sounds:
+        available = sound_lib.get_available_sounds()
+        if not available:
+            print("No sounds found.")
+            sys.exit(1)
+        for channel in range(16):
+            sound_lib.assign_sound_to_channel(channel, available[0])
+
+    if args.midi_file:
+        _, events = load_midi_events(args.midi_file)
+    else:
+        events = STORMS[args.storm](args.duration)
+
+    thresholds = {
+        'dropped': args.max_dropped,
+        'late': args.max_late,
+        'errors': args.max_errors,
+        'timer_lag': args.max_timer_lag / 1000,
+        'overruns': args.max_overruns,
+        'underflows': args.max_underflows,
+        'memory_growth_mb': args.max_memory_growth
+    }
+    test = SoakTest(sound_lib, events, speed=args.speed, blocksize=args.blocksize,
+                    thresholds=thresholds, warmup=args.warmup)
+    report = test.run()
+
+    print(f"Events:        {report['delivered']}/{report['events']} delivered, "
+          f"{report['dropped']} dropped, {report['late']} late, {report['errors']} errors "
+          f"(max {report['max_lateness'] * 1000:.1f} ms queued, "
+          f"{report['timer_lag'] * 1000:.1f} ms timer lag)")
+    print(f"Peak voices:   {report['peak_voices']}")
+    print(f"Callbacks:     {report['callbacks']}, {report['overruns']} overruns, "
+          f"{report['underflows']} underflows, peak load {report['peak_load']:.2f}")
+    print(f"Memory growth: {report['memory_growth_mb']:.1f} MB "
+          f"(plus {report['cache_growth_mb']:.1f} MB of sample caches)")
+
+    if report['failures']:
+        print("\nFAILED:")
+        for failure in report['failures']:
+            print(f"- {failure}")
+        sys.exit(1)
+    print("\nPASSED")
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import the package modules directly
-from src.midi_sound_player import MidiListener, SoundLibrary, load_pipewire_device
+from src.midi_sound_player import MidiListener, SoundLibrary, SoundPlayer, LibraryWatcher, Recorder, QualityController, load_pipewire_device
 import sounddevice as sd
 
 def main():
@@ -24,6 +24,17 @@ def main():
                        help='Configuration file (optional)')
     parser.add_argument('--device', type=int, default=9,
                        help='PipeWire device ID (default: 8)')
+    parser.add_argument('--pitch-mode', type=str, default='resample',
+                       choices=['resample', 'phase_vocoder'],
+                       help='How notes are pitched (default: resample)')
+    parser.add_argument('--prerender', type=int, nargs=2, metavar=('LOW', 'HIGH'),
+                       help='Pre-render pitched notes for this MIDI note range')
+    parser.add_argument('--watch', action='store_true',
+                       help='Reload sound files when they change on disk')
+    parser.add_argument('--record', type=str,
+                       help='Record the output to a WAV/FLAC file')
+    parser.add_argument('--adaptive-quality', action='store_true',
+                       help='Lower playback quality step by step when the audio callback is overloaded')
     args = parser.parse_args()
     
     # Configure audio device
@@ -61,12 +72,35 @@ def main():
                 print(f"Channel {channel}: {name}")
                 break
     
+    sound_player = SoundPlayer(pitch_mode=args.pitch_mode)
+    if args.prerender:
+        low, high = args.prerender
+        print(f"\nPre-rendering notes {low}-{high}...")
+        for sound_path in set(sound_lib.channel_sounds.values()):
+            sound_player.prerender(sound_path, range(low, high + 1))
+    
     # Start MIDI listener
     print(f"\nListening for MIDI on port {args.port}...")
     print("Press Ctrl+C to stop")
     
     # Create and start the MIDI listener
-    midi_listener = MidiListener(sound_lib, port=args.port)
+    midi_listener = MidiListener(sound_lib, port=args.port, sound_player=sound_player)
+    
+    watcher = None
+    if args.watch:
+        watcher = LibraryWatcher(sound_lib, sound_player,
+                                 on_reload=lambda changes: print(f"Reloaded sounds: {changes}"))
+        watcher.start()
+    
+    quality = None
+    if args.adaptive_quality:
+        quality = QualityController(sound_player)
+    
+    recorder = None
+    if args.record:
+        recorder = Recorder(sound_player)
+        recorder.start(args.record)
+        print(f"Recording to {args.record}")
     
     try:
         # Keep the script running
@@ -76,6 +110,14 @@ def main():
         print("\nStopping...")
     finally:
         # Clean up
+        if recorder is not None:
+            recorder.stop()
+            print(f"Recorded {recorder.frames_written} frames ({recorder.overflows} dropped)")
+        if watcher is not None:
+            watcher.stop()
+        if quality is not None:
+            print(f"Quality controller: {quality.get_stats()}")
+            quality.close()
         midi_listener.close()
 
 if __name__ == "__main__":
@@ -1,6 +1,16 @@
 from .midi_listener import MidiListener
 from .sound_player import SoundPlayer
 from .sound_library import SoundLibrary
+from .sequencer import Sequencer
+from .midi_file import TempoMap, load_midi_events
+from .sample_bank import SampleBank, compile_bank
+from .backends import NullOutputStream
+from .recorder import Recorder
+from .looper import Looper, Transport
+from .hot_reload import LibraryWatcher
+from .quality import QualityController
+from .soak import SoakTest, VirtualMidiSource
+from .calibration import LatencyCalibrator, save_calibration, load_calibration
 from .utils import note_to_freq, freq_to_note, load_pipewire_device
 
 __version__ = '0.1.0'
@@ -8,6 +18,22 @@ __all__ = [
     'MidiListener',
     'SoundPlayer',
     'SoundLibrary',
+    'Sequencer',
+    'TempoMap',
+    'load_midi_events',
+    'SampleBank',
+    'compile_bank',
+    'NullOutputStream',
+    'LatencyCalibrator',
+    'LibraryWatcher',
+    'QualityController',
+    'Recorder',
+    'Looper',
+    'Transport',
+    'SoakTest',
+    'VirtualMidiSource',
+    'save_calibration',
+    'load_calibration',
     'note_to_freq',
     'freq_to_note',
     'load_pipewire_device'
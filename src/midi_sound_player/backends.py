@@ -0,0 +1,106 @@
+import threading
+import time
+
+import numpy as np
+
+class NullCallbackFlags:
+    def __init__(self, output_underflow=False):
+        """Minimal stand-in for sounddevice.CallbackFlags."""
+        self.output_underflow = output_underflow
+
+    def __bool__(self):
+        return self.output_underflow
+
+    def __str__(self):
+        return "output underflow" if self.output_underflow else ""
+
+class NullOutputStream:
+    def __init__(self, samplerate=44100, blocksize=1024, channels=1, callback=None,
+                 device=None, latency=None, speed=1.0, buffer_blocks=2):
+        """
+        Output stream that discards audio, driven by its own clock thread.
+
+        Accepts the same arguments as sounddevice.OutputStream, so it can be
+        passed as the `backend` of a SoundPlayer. Blocks are requested at
+        `speed` times real time (None runs as fast as possible).
+
+        Like a device, the stream plays from a buffer of `buffer_blocks`
+        blocks: block i is requested when block i - buffer_blocks starts
+        playing and is due when block i starts. Only a block that is
+        finished after it was due is reported to the callback as an output
+        underflow, so wake-up jitter of the clock thread is absorbed by the
+        buffer just as a real device absorbs it.
+
+        Args:
+            samplerate: Sample rate in Hz
+            blocksize: Frames per callback
+            channels: Number of output channels
+            callback: Function called as callback(outdata, frames, time, status)
+            device: Ignored
+            latency: Ignored
+            speed: Clock speed relative to real time (default=1.0)
+            buffer_blocks: Blocks buffered ahead of the playback position
+        """
+        self.samplerate = samplerate
+        self.blocksize = blocksize or 1024
+        self.channels = channels
+        self.callback = callback
+        self.device = device
+        self.latency = latency
+        self.speed = speed
+        self.buffer_blocks = max(1, buffer_blocks)
+
+        self.frames_played = 0
+        self._outdata = np.zeros((self.blocksize, channels), dtype=np.float32)
+        self._running = False
+        self._thread = None
+
+    @property
+    def active(self):
+        return self._running
+
+    def start(self):
+        """Start calling the callback from the clock thread."""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the clock thread."""
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        """Close the stream."""
+        self.stop()
+
+    def _run(self):
+        period = self.blocksize / self.samplerate / self.speed if self.speed else 0.0
+        status = NullCallbackFlags()
+        start = time.perf_counter()
+        block = 0  # Blocks requested since the clock (re)started
+
+        while self._running:
+            if period:
+                # Wait until there is room for the block in the buffer
+                delay = start + block * period - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            self.callback(self._outdata, self.blocksize, None, status)
+            self.frames_played += self.blocksize
+            block += 1
+
+            if not period:
+                continue
+
+            now = time.perf_counter()
+            late = now > start + (block - 1 + self.buffer_blocks) * period
+            status = NullCallbackFlags(output_underflow=late)
+            if late:
+                # The buffer ran dry: restart the clock instead of trying to catch up
+                start = now - block * period
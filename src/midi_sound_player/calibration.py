@@ -0,0 +1,200 @@
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import sounddevice as sd
+
+from .backends import NullOutputStream
+from .sound_player import SoundPlayer
+from .utils import note_to_freq
+
+DEFAULT_CONFIG_FILE = Path.home() / '.config' / 'midi_sound_player' / 'calibration.json'
+DEFAULT_BLOCKSIZES = (64, 128, 256, 512, 1024, 2048)
+DEFAULT_LATENCIES = ('low', 'high')
+NULL_DEVICE = 'null'
+LOAD_CHANNEL = 0  # Channel the synthetic voices play on
+LOAD_NOTES = range(48, 72)  # Notes the synthetic voices are pitched to
+LOAD_PITCH_BEND = 9000  # Keeps every voice on the interpolating, variable-rate path
+
+def device_name(device=None, null_backend=False):
+    """Get the name a device's calibration is stored under."""
+    if null_backend:
+        return NULL_DEVICE
+    return sd.query_devices(device, 'output')['name']
+
+class LatencyCalibrator:
+    def __init__(self, device=None, sample_rate=44100, voices=32, sound_file=None,
+                 null_backend=False, blocksizes=DEFAULT_BLOCKSIZES,
+                 latencies=DEFAULT_LATENCIES, headroom=0.5, duration=2.0,
+                 channel_effects=None, master_effects=None, percentile=99.0):
+        """
+        Initialize latency calibrator.
+
+        Each candidate setting runs the real SoundPlayer mixer with `voices`
+        looping voices for `duration` seconds. The voices are pitched to
+        different notes on a channel with pitch bend and modulation, so
+        they take the same interpolating path as played notes, and the
+        channel and master buses carry the configured effects. A setting
+        passes when no block underflowed and the `percentile` of callback
+        times used at most `headroom` of the deadline (blocksize /
+        sample_rate). A percentile rather than the single slowest callback
+        keeps one scheduler hiccup from deciding the result.
+
+        The null backend has no latency setting, so with `null_backend`
+        only the block sizes are calibrated.
+
+        Args:
+            device: Output device to calibrate (default=None, system default)
+            sample_rate: Output sample rate
+            voices: Number of simultaneous voices in the synthetic load
+            sound_file: Sound used for the voices (default=None, white noise)
+            null_backend: Measure against a null output instead of the device
+            blocksizes: Candidate block sizes, tried smallest first
+            latencies: Candidate stream latencies, tried in order
+            headroom: Maximum fraction of the deadline a callback may use
+            duration: Measurement time per candidate in seconds
+            channel_effects: Function returning the effects of the voice
+                channel's bus, called as channel_effects(sample_rate)
+            master_effects: Function returning the master bus effects,
+                called as master_effects(sample_rate)
+            percentile: Percentile of the callback loads compared to `headroom`
+        """
+        self.device = device
+        self.sample_rate = sample_rate
+        self.voices = voices
+        self.sound_file = sound_file
+        self.null_backend = null_backend
+        self.blocksizes = sorted(blocksizes)
+        self.latencies = [None] if null_backend else list(latencies)
+        self.headroom = headroom
+        self.duration = duration
+        self.channel_effects = channel_effects
+        self.master_effects = master_effects
+        self.percentile = percentile
+        self.results = []  # Measurements of every candidate tried
+
+    def measure(self, blocksize, latency):
+        """
+        Measure one blocksize/latency setting under the synthetic load.
+
+        Returns:
+            SoundPlayer.get_callback_stats() plus the setting, the
+            'percentile_load' and a 'passed' flag
+        """
+        player = SoundPlayer(
+            sample_rate=self.sample_rate,
+            blocksize=blocksize,
+            device=None if self.null_backend else self.device,
+            latency=latency,
+            backend=NullOutputStream if self.null_backend else None,
+            progressive=False  # Render the variants up front, not during the measurement
+        )
+
+        # Effects are stateful, so every candidate gets new instances
+        if self.channel_effects:
+            bus = player.get_channel_bus(LOAD_CHANNEL)
+            for effect in self.channel_effects(self.sample_rate):
+                bus.add_effect(effect)
+        if self.master_effects:
+            for effect in self.master_effects(self.sample_rate):
+                player.master_bus.add_effect(effect)
+
+        controls = player.get_channel_controls(LOAD_CHANNEL)
+        controls.set_pitch_bend(LOAD_PITCH_BEND)
+        controls.modulation.set(0.5)
+
+        if self.sound_file:
+            sound = self.sound_file
+            player.load_sound(sound)
+        else:
+            # Prime the cache with one second of noise instead of a file
+            sound = '<calibration-noise>'
+            noise = np.random.default_rng(0).uniform(-0.1, 0.1, self.sample_rate).astype(np.float32)
+            player.sounds[sound] = (noise, self.sample_rate)
+
+        try:
+            notes = list(LOAD_NOTES)
+            for i in range(self.voices):
+                player.play_sound(sound, freq=note_to_freq(notes[i % len(notes)]),
+                                  volume=1.0 / self.voices, loop=True, channel=LOAD_CHANNEL)
+
+            # Let the stream settle before measuring
+            time.sleep(min(0.2, self.duration / 4))
+            player.reset_callback_stats()
+
+            # Each block listener call sees the time of the previous callback
+            times = []
+            def record(frame_time, frames):
+                if player.callback_count > len(times):
+                    times.append(player.callback_time)
+            player.add_block_listener(record)
+            time.sleep(self.duration)
+            player.remove_block_listener(record)
+            stats = player.get_callback_stats()
+        finally:
+            player.cleanup()
+
+        deadline = blocksize / self.sample_rate
+        percentile_load = float(np.percentile(times, self.percentile)) / deadline if times else stats['peak_load']
+        stats.update({
+            'blocksize': blocksize,
+            'latency': latency,
+            'percentile_load': percentile_load,
+            'passed': stats['underflows'] == 0 and percentile_load <= self.headroom
+        })
+        return stats
+
+    def run(self):
+        """
+        Find the lowest safe setting.
+
+        Returns:
+            Calibration dict, or None if no candidate passed
+        """
+        self.results = []
+        for blocksize in self.blocksizes:
+            for latency in self.latencies:
+                stats = self.measure(blocksize, latency)
+                self.results.append(stats)
+                if stats['passed']:
+                    return {
+                        'device': device_name(self.device, self.null_backend),
+                        'sample_rate': self.sample_rate,
+                        'blocksize': blocksize,
+                        'latency': latency,
+                        'voices': self.voices,
+                        'peak_load': stats['peak_load'],
+                        'percentile_load': stats['percentile_load'],
+                        'mean_load': stats['mean_load']
+                    }
+        return None
+
+def save_calibration(calibration, config_file=None):
+    """Save a calibration result, keyed by device name."""
+    config_file = Path(config_file or DEFAULT_CONFIG_FILE)
+    config = {}
+    if config_file.exists():
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+
+    config[calibration['device']] = calibration
+
+    config_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(config_file, 'w') as f:
+        json.dump(config, f, indent=2)
+
+def load_calibration(device=None, config_file=None, null_backend=False):
+    """
+    Load the saved calibration of a device.
+
+    Returns:
+        Calibration dict, or None if the device has not been calibrated
+    """
+    config_file = Path(config_file or DEFAULT_CONFIG_FILE)
+    if not config_file.exists():
+        return None
+
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+    return config.get(device_name(device, null_backend))
@@ -0,0 +1,180 @@
+import bisect
+import itertools
+import math
+from collections import deque
+
+class SmoothedParameter:
+    def __init__(self, value, smoothing_time=0.01):
+        """
+        Initialize a parameter that glides towards its target.
+
+        Args:
+            value: Initial value
+            smoothing_time: Time constant of the glide in seconds
+        """
+        self.value = value
+        self.target = value
+        self.previous = value  # Value at the start of the last block
+        self.smoothing_time = smoothing_time
+
+    def set(self, target):
+        """Set a new target value."""
+        self.target = target
+
+    def advance(self, seconds):
+        """Move towards the target by one block of `seconds`."""
+        self.previous = self.value
+        if self.smoothing_time <= 0:
+            self.value = self.target
+        else:
+            self.value += (self.target - self.value) * (1 - math.exp(-seconds / self.smoothing_time))
+            if abs(self.target - self.value) < 1e-5:
+                self.value = self.target
+        return self.value
+
+class ChannelControls:
+    def __init__(self, bend_range=2.0, vibrato_rate=5.5, vibrato_depth=0.5, smoothing_time=0.01):
+        """
+        Initialize the controller state of a MIDI channel.
+
+        The values are read by the mixer once per block: pitch bend and
+        modulation set the playback rate, volume and expression set the
+        gain of every voice on the channel. Controller changes posted with
+        a stream frame (see post) take effect at the block boundary nearest
+        to that frame.
+
+        Args:
+            bend_range: Pitch bend range in semitones
+            vibrato_rate: Modulation wheel vibrato rate in Hz
+            vibrato_depth: Vibrato depth in semitones at full modulation
+            smoothing_time: Time constant of parameter changes in seconds
+        """
+        self.bend_range = bend_range
+        self.vibrato_rate = vibrato_rate
+        self.vibrato_depth = vibrato_depth
+
+        self.pitch_bend = SmoothedParameter(0.0, smoothing_time)  # Semitones
+        self.modulation = SmoothedParameter(0.0, smoothing_time)  # 0-1
+        self.volume = SmoothedParameter(1.0, smoothing_time)  # CC7, 0-1
+        self.expression = SmoothedParameter(1.0, smoothing_time)  # CC11, 0-1
+        self._sustain = False  # CC64 state before the first of _sustain_changes
+        self._sustain_changes = []  # (at_sample, order, down) pedal changes ahead of the clock
+
+        self._vibrato_phase = 0.0
+
+        self._posted = deque()  # (at_sample, order, name, target) from other threads
+        self._pending = []  # Posted changes sorted by frame, owned by the audio thread
+        self._order = itertools.count()  # Keeps changes at the same frame in posting order
+
+    def post(self, name, target, at_sample=None):
+        """
+        Set the target of a parameter at a stream frame.
+
+        Safe to call from any thread; the change is applied by advance().
+
+        Args:
+            name: 'pitch_bend', 'modulation', 'volume' or 'expression'
+            target: New target value
+            at_sample: Stream frame at which the change takes effect
+                (default=None, with the next block)
+        """
+        self._posted.append((at_sample, next(self._order), name, target))
+
+    def set_pitch_bend(self, value, at_sample=None):
+        """Set pitch bend from a 14-bit MIDI value (0-16383, center 8192)."""
+        self.post('pitch_bend', (value - 8192) / 8192.0 * self.bend_range, at_sample)
+
+    def post_sustain(self, down, at_sample, frame_time):
+        """
+        Record a sustain pedal change at a stream frame.
+
+        The pedal is tracked on the MIDI side, where note-offs are decided,
+        so changes posted ahead of the clock only hold notes from their
+        frame on (see sustain_at).
+
+        Args:
+            down: True for pedal down
+            at_sample: Stream frame of the change (None for now)
+            frame_time: Current stream frame
+        """
+        self._expire_sustain(frame_time)
+        at_sample = frame_time if at_sample is None else max(at_sample, frame_time)
+        bisect.insort(self._sustain_changes, (at_sample, next(self._order), down))
+
+    def sustain_at(self, frame, frame_time):
+        """
+        Get the sustain pedal state at a stream frame.
+
+        Args:
+            frame: Stream frame to look up
+            frame_time: Current stream frame
+
+        Returns:
+            (down, release): whether the pedal is down at `frame` and, if so,
+            the frame of the next posted release (None if not posted yet)
+        """
+        self._expire_sustain(frame_time)
+        down = self._sustain
+        for at_sample, order, change in self._sustain_changes:
+            if at_sample <= frame:
+                down = change
+            elif down and not change:
+                return True, at_sample
+        return down, None
+
+    def _expire_sustain(self, frame_time):
+        """Fold the pedal changes the clock has reached into `_sustain`."""
+        expired = 0
+        for at_sample, order, down in self._sustain_changes:
+            if at_sample > frame_time:
+                break
+            self._sustain = down
+            expired += 1
+        if expired:
+            del self._sustain_changes[:expired]
+
+    def _apply_posted(self, block_start, frames):
+        """Apply the posted changes that fall closer to this block than to the next."""
+        while self._posted:
+            at_sample, order, name, target = self._posted.popleft()
+            if at_sample is None:
+                at_sample = block_start if block_start is not None else 0
+            bisect.insort(self._pending, (at_sample, order, name, target))
+
+        applied = 0
+        for at_sample, order, name, target in self._pending:
+            if block_start is not None and at_sample >= block_start + frames // 2:
+                break
+            getattr(self, name).set(target)
+            applied += 1
+        if applied:
+            del self._pending[:applied]
+
+    def advance(self, frames, sample_rate, block_start=None):
+        """
+        Advance all parameters by one block.
+
+        Args:
+            frames: Block length
+            sample_rate: Sample rate in Hz
+            block_start: Stream frame of the block, used to apply posted
+                changes (default=None, applies all of them)
+
+        Returns:
+            (rate, gain_start, gain_end): playback rate for the block and
+            the channel gain to ramp between
+        """
+        self._apply_posted(block_start, frames)
+
+        seconds = frames / sample_rate
+        for parameter in (self.pitch_bend, self.modulation, self.volume, self.expression):
+            parameter.advance(seconds)
+
+        semitones = self.pitch_bend.value
+        if self.modulation.value > 0:
+            semitones += self.modulation.value * self.vibrato_depth * math.sin(self._vibrato_phase)
+        self._vibrato_phase = (self._vibrato_phase + 2 * math.pi * self.vibrato_rate * seconds) % (2 * math.pi)
+
+        gain_start = self.volume.previous * self.expression.previous
+        gain_end = self.volume.value * self.expression.value
+        return 2.0 ** (semitones / 12.0), gain_start, gain_end
@@ -0,0 +1,310 @@
+import time
+
+import numpy as np
+import scipy.signal as signal
+
+from .utils import read_mono
+
+class BiquadFilter:
+    def __init__(self, kind='lowpass', freq=1000.0, q=0.707, gain_db=0.0, sample_rate=44100):
+        """
+        Initialize a biquad filter (RBJ cookbook designs).
+
+        The filter state is carried from block to block, so filtering a
+        stream block by block gives the same result as filtering it whole.
+
+        Args:
+            kind: 'lowpass', 'highpass', 'bandpass', 'notch', 'peaking',
+                'lowshelf' or 'highshelf'
+            freq: Cutoff/center frequency in Hz
+            q: Quality factor
+            gain_db: Gain for peaking and shelving filters
+            sample_rate: Sample rate in Hz
+        """
+        self.kind = kind
+        self.freq = freq
+        self.q = q
+        self.gain_db = gain_db
+        self.sample_rate = sample_rate
+        self.bypass = False
+
+        self.b, self.a = self._design()
+        self.zi = np.zeros(2)
+
+    def _design(self):
+        """Compute normalized (b, a) coefficients."""
+        w0 = 2 * np.pi * self.freq / self.sample_rate
+        cos_w0, sin_w0 = np.cos(w0), np.sin(w0)
+        alpha = sin_w0 / (2 * self.q)
+        A = 10 ** (self.gain_db / 40)
+
+        if self.kind == 'lowpass':
+            b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+            a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+        elif self.kind == 'highpass':
+            b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+            a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+        elif self.kind == 'bandpass':
+            b = [alpha, 0, -alpha]
+            a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+        elif self.kind == 'notch':
+            b = [1, -2 * cos_w0, 1]
+            a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+        elif self.kind == 'peaking':
+            b = [1 + alpha * A, -2 * cos_w0, 1 - alpha * A]
+            a = [1 + alpha / A, -2 * cos_w0, 1 - alpha / A]
+        elif self.kind in ('lowshelf', 'highshelf'):
+            sign = 1 if self.kind == 'lowshelf' else -1
+            sqrt_a = 2 * np.sqrt(A) * alpha
+            b = [A * ((A + 1) - sign * (A - 1) * cos_w0 + sqrt_a),
+                 sign * 2 * A * ((A - 1) - sign * (A + 1) * cos_w0),
+                 A * ((A + 1) - sign * (A - 1) * cos_w0 - sqrt_a)]
+            a = [(A + 1) + sign * (A - 1) * cos_w0 + sqrt_a,
+                 -sign * 2 * ((A - 1) + sign * (A + 1) * cos_w0),
+                 (A + 1) + sign * (A - 1) * cos_w0 - sqrt_a]
+        else:
+            raise ValueError(f"Unknown filter type: {self.kind}")
+
+        b = np.array(b) / a[0]
+        a = np.array(a) / a[0]
+        return b, a
+
+    def set_params(self, freq=None, q=None, gain_db=None):
+        """Update filter parameters, keeping the filter state."""
+        if freq is not None:
+            self.freq = freq
+        if q is not None:
+            self.q = q
+        if gain_db is not None:
+            self.gain_db = gain_db
+        self.b, self.a = self._design()
+
+    def process(self, block):
+        """Filter one block."""
+        out, self.zi = signal.lfilter(self.b, self.a, block, zi=self.zi)
+        return out
+
+    def reset(self):
+        """Clear the filter state."""
+        self.zi = np.zeros(2)
+
+class FilterChain:
+    def __init__(self, filters=None):
+        """
+        Initialize a chain of biquad filters applied in series.
+
+        Args:
+            filters: List of BiquadFilter instances
+        """
+        self.filters = list(filters or [])
+        self.bypass = False
+
+    def add_filter(self, biquad):
+        """Append a filter to the chain."""
+        self.filters.append(biquad)
+
+    def process(self, block):
+        """Filter one block through every filter in the chain."""
+        for biquad in self.filters:
+            if not biquad.bypass:
+                block = biquad.process(block)
+        return block
+
+    def reset(self):
+        """Clear the state of every filter."""
+        for biquad in self.filters:
+            biquad.reset()
+
+class ConvolutionReverb:
+    def __init__(self, impulse_response, blocksize=None, wet=0.3, dry=1.0):
+        """
+        Initialize a uniformly partitioned FFT convolution reverb.
+
+        The impulse response is split into partitions of the block size.
+        Each block is transformed once and multiplied with every partition
+        through a frequency-domain delay line (overlap-save), so the output
+        has no latency beyond the block itself.
+
+        Args:
+            impulse_response: Mono impulse response
+            blocksize: Partition size (default=None, set by the EffectBus the
+                reverb is added to, or by the first processed block)
+            wet: Level of the reverberated signal
+            dry: Level of the direct signal
+        """
+        self.impulse_response = np.asarray(impulse_response, dtype=np.float64)
+        self.blocksize = None
+        self.wet = wet
+        self.dry = dry
+        self.bypass = False
+
+        if blocksize is not None:
+            self.prepare(blocksize)
+
+    def prepare(self, blocksize):
+        """
+        Partition the impulse response for blocks of `blocksize` frames.
+
+        Called when the reverb is added to an EffectBus. If a block of
+        another size arrives later, the reverb is re-partitioned and its
+        tail restarts.
+        """
+        if blocksize == self.blocksize:
+            return
+
+        ir = self.impulse_response
+        n_partitions = max(1, -(-len(ir) // blocksize))
+        padded = np.zeros(n_partitions * blocksize)
+        padded[:len(ir)] = ir
+        partitions = padded.reshape(n_partitions, blocksize)
+
+        # Spectra of each partition, zero-padded to 2 * blocksize
+        self.ir_spectra = np.fft.rfft(partitions, n=2 * blocksize, axis=1)
+        self.fdl = np.zeros_like(self.ir_spectra)  # Frequency-domain delay line
+        self.fdl_index = 0
+        self.input_buffer = np.zeros(2 * blocksize)
+        self.blocksize = blocksize
+
+    @classmethod
+    def from_file(cls, filepath, sample_rate=44100, **kwargs):
+        """Create a reverb from an impulse response file."""
+        ir, sr = read_mono(filepath)
+        if sr != sample_rate:
+            ir = signal.resample_poly(ir, sample_rate, sr)
+
+        return cls(ir, **kwargs)
+
+    def process(self, block):
+        """Convolve one block with the impulse response."""
+        if len(block) != self.blocksize:
+            self.prepare(len(block))
+        B = self.blocksize
+
+        # Slide the input window and transform it
+        self.input_buffer[:B] = self.input_buffer[B:]
+        self.input_buffer[B:] = block
+        self.fdl[self.fdl_index] = np.fft.rfft(self.input_buffer)
+
+        # Multiply-accumulate every partition with the matching delayed spectrum
+        order = (self.fdl_index - np.arange(len(self.fdl))) % len(self.fdl)
+        spectrum = np.einsum('pk,pk->k', self.fdl[order], self.ir_spectra)
+        self.fdl_index = (self.fdl_index + 1) % len(self.fdl)
+
+        tail = np.fft.irfft(spectrum, n=2 * B)[B:]
+        return self.dry * block + self.wet * tail
+
+    def reset(self):
+        """Clear the reverb tail."""
+        if self.blocksize is None:
+            return
+        self.fdl.fill(0)
+        self.input_buffer.fill(0)
+        self.fdl_index = 0
+
+class EffectBus:
+    def __init__(self, effects=None, sample_rate=44100, blocksize=1024, bypass_fade=0.05):
+        """
+        Initialize an effect bus.
+
+        A bus owns a mix buffer, runs its effects in series once per block
+        and keeps timing statistics for the CPU cost of that processing.
+        When an effect's `bypass` flag changes, the bus crossfades between
+        its output and its input over `bypass_fade` seconds, so reverb
+        tails fade out instead of being cut.
+
+        Args:
+            effects: List of effects (objects with process(block) and bypass)
+            sample_rate: Sample rate in Hz
+            blocksize: Block size of the stream; also passed to the
+                prepare() method of effects that have one
+            bypass_fade: Crossfade time in seconds when bypassing an effect
+        """
+        self.effects = []
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.bypass_fade = bypass_fade
+        self.buffer = np.zeros(blocksize, dtype=np.float32)
+
+        self.cpu_time = 0.0  # Seconds spent in the last block
+        self.peak_cpu_time = 0.0
+        self.total_cpu_time = 0.0
+        self.blocks = 0
+        self.effect_cpu_times = {}  # {effect: seconds in the last block it ran}
+        self.effect_levels = {}  # {effect: 1.0 active ... 0.0 bypassed}, ramped by process()
+
+        for effect in effects or []:
+            self.add_effect(effect)
+
+    def add_effect(self, effect):
+        """Append an effect to the bus, preparing it for the bus block size."""
+        if hasattr(effect, 'prepare'):
+            effect.prepare(self.blocksize)
+        self.effects.append(effect)
+        return effect
+
+    def remove_effect(self, effect):
+        """Remove an effect from the bus."""
+        if effect in self.effects:
+            self.effects.remove(effect)
+        self.effect_cpu_times.pop(effect, None)
+        self.effect_levels.pop(effect, None)
+
+    def begin(self, frames):
+        """Return the zeroed bus buffer for the next block."""
+        if len(self.buffer) < frames:
+            self.buffer = np.zeros(frames, dtype=np.float32)
+        view = self.buffer[:frames]
+        view.fill(0)
+        return view
+
+    def process(self, block):
+        """Run one block through every effect and record the time taken."""
+        start = time.perf_counter()
+        for effect in list(self.effects):
+            level = self.effect_levels.get(effect, 0.0 if effect.bypass else 1.0)
+            target = 0.0 if effect.bypass else 1.0
+            if level == target == 0.0:
+                continue
+
+            effect_start = time.perf_counter()
+            processed = effect.process(block)
+            if level == target:
+                block = processed
+            else:
+                # Crossfade between the input and the effect output
+                step = len(block) / max(self.bypass_fade * self.sample_rate, 1.0)
+                end = min(level + step, 1.0) if target > level else max(level - step, 0.0)
+                ramp = np.linspace(level, end, len(block), dtype=np.float32)
+                block = block + (processed - block) * ramp
+                level = end
+                if level == 0.0 and hasattr(effect, 'reset'):
+                    effect.reset()  # Start clean when it is enabled again
+            self.effect_levels[effect] = level
+            self.effect_cpu_times[effect] = time.perf_counter() - effect_start
+
+        self.cpu_time = time.perf_counter() - start
+        self.peak_cpu_time = max(self.peak_cpu_time, self.cpu_time)
+        self.total_cpu_time += self.cpu_time
+        self.blocks += 1
+        return block
+
+    def get_stats(self, deadline=None):
+        """
+        Get CPU statistics for the bus.
+
+        Args:
+            deadline: Seconds allowed per block, used to express times as a
+                load (default=None, the real-time length of one block)
+
+        Returns:
+            Dict with last, peak and mean CPU time (seconds) and load (0-1)
+        """
+        deadline = deadline or self.blocksize / self.sample_rate
+        mean = self.total_cpu_time / self.blocks if self.blocks else 0.0
+        return {
+            'cpu_time': self.cpu_time,
+            'peak_cpu_time': self.peak_cpu_time,
+            'mean_cpu_time': mean,
+            'load': self.cpu_time / deadline,
+            'peak_load': self.peak_cpu_time / deadline
+        }
@@ -0,0 +1,129 @@
+import threading
+
+import scipy.signal as signal
+
+from .utils import read_mono
+
+class LibraryWatcher:
+    def __init__(self, sound_library, sound_player=None, interval=1.0, on_reload=None):
+        """
+        Initialize a watcher that hot-reloads changed sound files.
+
+        A background thread polls the file index of the library's sounds
+        directory. New and changed files are decoded, and the pitched
+        variants already cached for them are re-rendered, on that thread.
+        The results are then swapped into the SoundLibrary and SoundPlayer
+        with single assignments, so the MIDI and audio threads never block
+        and voices already playing finish with their old buffers.
+
+        Args:
+            sound_library: SoundLibrary with a sounds_dir
+            sound_player: SoundPlayer whose caches are updated (optional)
+            interval: Seconds between polls
+            on_reload: Optional function called as on_reload(changes) after
+                each poll that found changes
+        """
+        if not sound_library.sounds_dir:
+            raise ValueError("Sound library has no sounds directory to watch")
+
+        self.sound_library = sound_library
+        self.sound_player = sound_player
+        self.interval = interval
+        self.on_reload = on_reload
+
+        self.index = sound_library.index_sounds_directory()
+        self._pending = {}  # {name: index entry} changes waiting to settle
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start polling on a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                changes = self.poll()
+            except Exception as e:
+                # Keep watching; a half-written file is retried next poll
+                print(f"Error reloading sounds: {e}")
+                continue
+            if self.on_reload and any(changes.values()):
+                self.on_reload(changes)
+
+    def poll(self):
+        """
+        Check the sounds directory once and reload what changed.
+
+        Returns:
+            Dict with the 'added', 'changed' and 'removed' sound names
+        """
+        index = self.sound_library.index_sounds_directory()
+        modified = [name for name in index if self.index.get(name) != index[name]]
+        settled = [name for name in modified if self._pending.get(name) == index[name]]
+        self._pending = {name: index[name] for name in modified if name not in settled}
+
+        # Files still being written keep their previous state for now
+        new_index = dict(index)
+        for name in self._pending:
+            if name in self.index:
+                new_index[name] = self.index[name]
+            else:
+                del new_index[name]
+
+        added = [name for name in settled if name not in self.index]
+        changed = [name for name in settled if name in self.index]
+        removed = [name for name in self.index if name not in index]
+
+        # New files are decoded here too, so their first note does not
+        # decode on the MIDI thread
+        for name in added:
+            self._preload(index[name][0])
+        for name in changed:
+            self._reload(index[name][0])
+
+        # Removed sounds stay in the player cache, so channels still
+        # assigned to them keep playing the last version
+        self.sound_library.set_available_sounds({name: entry[0] for name, entry in new_index.items()})
+        self.index = new_index
+
+        return {'added': added, 'changed': changed, 'removed': removed}
+
+    def _decode(self, filepath):
+        """Read a file at the player rate."""
+        data, sr = read_mono(filepath)
+
+        # The mixer plays every sound at the player rate, and banks are
+        # compiled at it, so convert the new data the same way
+        if sr != self.sound_player.sample_rate:
+            data = signal.resample_poly(data, self.sound_player.sample_rate, sr).astype('float32')
+            sr = self.sound_player.sample_rate
+        return data, sr
+
+    def _preload(self, filepath):
+        """Decode a new file into the player cache."""
+        if self.sound_player is None:
+            return
+        data, sr = self._decode(filepath)
+        self.sound_player.replace_sound(filepath, data, sr)
+
+    def _reload(self, filepath):
+        """Decode a file and swap it into the player cache."""
+        if self.sound_player is None or filepath not in self.sound_player.sounds:
+            return  # Not loaded yet; it will be read on first use
+
+        data, sr = self._decode(filepath)
+        variants = {freq: self.sound_player.render_variant(data, sr, freq)
+                    for freq in self.sound_player.get_cached_freqs(filepath)}
+        self.sound_player.replace_sound(filepath, data, sr, variants)
@@ -0,0 +1,504 @@
+import abc
+import math
+import threading
+
+import numpy as np
+from rtmidi2 import NOTEON, NOTEOFF
+
+from .midi_listener import HeldNotes
+
+class Transport:
+    def __init__(self, sound_player, tempo=120.0, beats_per_bar=4):
+        """
+        Initialize the transport clock.
+
+        Bars and beats are counted in stream frames from `start_frame`,
+        so every quantized action lands on an exact sample.
+
+        Args:
+            sound_player: SoundPlayer whose frame clock drives the transport
+            tempo: Tempo in BPM
+            beats_per_bar: Beats per bar
+        """
+        self.sound_player = sound_player
+        self.tempo = tempo
+        self.beats_per_bar = beats_per_bar
+        self.start_frame = None
+
+    @property
+    def frames_per_beat(self):
+        return self.sound_player.sample_rate * 60.0 / self.tempo
+
+    @property
+    def frames_per_bar(self):
+        return self.frames_per_beat * self.beats_per_bar
+
+    @property
+    def running(self):
+        return self.start_frame is not None
+
+    def start(self, at_sample=None):
+        """Start the clock; bar 0 begins at `at_sample` (default: next block)."""
+        self.start_frame = self.next_frame() if at_sample is None else at_sample
+
+    def stop(self):
+        """Stop the clock."""
+        self.start_frame = None
+
+    def next_frame(self):
+        """First stream frame that is safe to schedule on."""
+        return self.sound_player.frame_time + self.sound_player.blocksize
+
+    def bars_to_frames(self, bars):
+        """Length of a number of bars in frames."""
+        return int(round(bars * self.frames_per_bar))
+
+    def next_boundary(self, quantize='bar'):
+        """
+        Get the next schedulable frame on a bar or beat boundary.
+
+        Args:
+            quantize: 'bar', 'beat' or None (no quantization)
+        """
+        earliest = self.next_frame()
+        if quantize is None or not self.running:
+            return earliest
+
+        unit = self.frames_per_bar if quantize == 'bar' else self.frames_per_beat
+        count = math.ceil((earliest - self.start_frame) / unit)
+        return self.start_frame + int(round(max(count, 0) * unit))
+
+    def position(self, frame=None):
+        """
+        Get the musical position of a frame.
+
+        Returns:
+            (bar, beat, fraction of the beat), all counted from 0
+        """
+        if not self.running:
+            return (0, 0, 0.0)
+
+        frame = self.sound_player.frame_time if frame is None else frame
+        beats = (frame - self.start_frame) / self.frames_per_beat
+        bar, beat = divmod(math.floor(beats), self.beats_per_bar)
+        return (bar, beat, beats - math.floor(beats))
+
+class LoopTrack(abc.ABC):
+    def __init__(self, transport, bars=4, quantize='bar'):
+        """
+        Initialize a loop track.
+
+        Recording and playback are described by frame intervals that the
+        control methods set on quantized boundaries; the audio and
+        scheduling threads only read them.
+
+        Args:
+            transport: Transport the loop is locked to
+            bars: Loop length in bars
+            quantize: Default quantization of actions ('bar', 'beat' or None)
+        """
+        self.transport = transport
+        self.bars = bars
+        self.quantize = quantize
+        self.length = transport.bars_to_frames(bars)
+        self.volume = 1.0
+
+        self.has_content = False
+        self.anchor = None  # Frame where the loop cycle starts
+        self.record_start = None
+        self.record_stop = None
+        self.play_start = None
+        self.play_stop = None
+        self.overdub_mode = False  # Add to the loop instead of replacing it
+
+    def _boundary(self, quantize):
+        return self.transport.next_boundary(self.quantize if quantize == 'default' else quantize)
+
+    def is_recording(self, frame):
+        return (self.record_start is not None and self.record_start <= frame
+                and (self.record_stop is None or frame < self.record_stop))
+
+    def is_playing(self, frame):
+        return (self.play_start is not None and self.play_start <= frame
+                and (self.play_stop is None or frame < self.play_stop))
+
+    def _recording_active(self):
+        """Whether a recording pass is running or scheduled."""
+        return self.record_start is not None and (
+            self.record_stop is None or self.record_stop > self.transport.sound_player.frame_time)
+
+    def record(self, quantize='default'):
+        """
+        Record the first pass of the loop.
+
+        Recording starts on the next boundary and lasts exactly one loop,
+        then the track switches to playback. A track that already has
+        content is overdubbed instead.
+        """
+        if self.has_content:
+            return self.overdub(quantize)
+
+        if not self.transport.running:
+            self.transport.start()
+
+        start = self._boundary(quantize)
+        self._clear_content()
+        self.overdub_mode = False
+        self.anchor = start
+        self.record_start = start
+        self.record_stop = start + self.length
+        self.play_start = start + self.length
+        self.play_stop = None
+        self.has_content = True
+        return start
+
+    def overdub(self, quantize='default'):
+        """Start adding to the loop on the next boundary."""
+        if not self.has_content:
+            return self.record(quantize)
+        if self._recording_active():
+            return self.record_start  # Already recording
+
+        self._snapshot()
+        start = self._boundary(quantize)
+        self.overdub_mode = True
+        self.record_start = start
+        self.record_stop = None
+        return start
+
+    def stop_recording(self, quantize='default'):
+        """Stop recording or overdubbing on the next boundary."""
+        if not self._recording_active():
+            return None
+
+        stop = max(self._boundary(quantize), self.record_start)
+        if self.record_stop is None or stop < self.record_stop:
+            self.record_stop = stop
+        return self.record_stop
+
+    def play(self, quantize='default'):
+        """Start playback on the next boundary, in phase with the loop."""
+        if not self.has_content:
+            return None
+        self.play_start = self._boundary(quantize)
+        self.play_stop = None
+        return self.play_start
+
+    def stop(self, quantize='default'):
+        """Stop playback (and recording) on the next boundary."""
+        stop = self._boundary(quantize)
+        self.stop_recording(quantize)
+        if self.play_start is not None:
+            self.play_stop = max(stop, self.play_start)
+        return stop
+
+    def undo(self):
+        """
+        Undo the last overdub (calling it again redoes it).
+
+        Only allowed while nothing is being recorded.
+        """
+        if not self.has_content or self._recording_active():
+            return False
+        self._swap_undo()
+        return True
+
+    def clear(self):
+        """Stop and erase the loop."""
+        self.record_start = self.record_stop = None
+        self.play_start = self.play_stop = None
+        self.has_content = False
+        self._clear_content()
+
+    def loop_position(self, frame):
+        """Position of a stream frame inside the loop."""
+        return (frame - self.anchor) % self.length
+
+    @abc.abstractmethod
+    def _clear_content(self):
+        """Erase the recorded content."""
+
+    @abc.abstractmethod
+    def _snapshot(self):
+        """Keep the current content as the undo state before an overdub."""
+
+    @abc.abstractmethod
+    def _swap_undo(self):
+        """Swap the current content with the undo state."""
+
+class AudioLoopTrack(LoopTrack):
+    def __init__(self, transport, bars=4, quantize='bar'):
+        """
+        Initialize an audio loop track.
+
+        The loop buffer, its undo copy and a scratch block are allocated
+        here, from the loop length, so recording, overdubbing and playback
+        never allocate on the audio thread.
+        """
+        super().__init__(transport, bars, quantize)
+        self.buffer = np.zeros(self.length, dtype=np.float32)
+        self.undo_buffer = np.zeros(self.length, dtype=np.float32)
+        self.scratch = np.zeros(max(transport.sound_player.blocksize, 4096), dtype=np.float32)
+
+    def _clear_content(self):
+        self.buffer.fill(0)
+        self.undo_buffer.fill(0)
+
+    def _snapshot(self):
+        # The buffer is only read while not recording, so copying here is safe
+        np.copyto(self.undo_buffer, self.buffer)
+
+    def _swap_undo(self):
+        self.buffer, self.undo_buffer = self.undo_buffer, self.buffer
+
+    def process(self, inp, out, block_start):
+        """
+        Record from `inp` and add playback to `out` (audio thread).
+
+        Args:
+            inp: Input block (the mix without loop playback)
+            out: Output block to add the loop into
+            block_start: Stream frame of the first sample
+        """
+        if self.anchor is None:
+            return
+
+        # Split the block wherever recording or playback starts or stops
+        n = len(inp)
+        edges = [0, n]
+        for edge in (self.record_start, self.record_stop, self.play_start, self.play_stop):
+            if edge is not None and 0 < edge - block_start < n:
+                edges.append(edge - block_start)
+        edges.sort()
+
+        for a, b in zip(edges, edges[1:]):
+            if a == b:
+                continue
+            frame = block_start + a
+            recording = self.is_recording(frame)
+            playing = self.is_playing(frame)
+            if recording or playing:
+                self._process_segment(inp, out, a, b, self.loop_position(frame), recording, playing)
+
+    def _process_segment(self, inp, out, a, b, position, recording, playing):
+        buffer = self.buffer
+        while a < b:
+            m = min(b - a, self.length - position, len(self.scratch))
+            loop = buffer[position:position + m]
+            scratch = self.scratch[:m]
+
+            if playing:
+                np.multiply(loop, self.volume, out=scratch)
+                out[a:a + m] += scratch
+            if recording:
+                if self.overdub_mode:
+                    loop += inp[a:a + m]
+                else:
+                    loop[:] = inp[a:a + m]
+
+            a += m
+            position = (position + m) % self.length
+
+class MidiLoopTrack(LoopTrack):
+    def __init__(self, transport, midi_listener, bars=4, quantize='bar', capacity=4096):
+        """
+        Initialize a MIDI loop track.
+
+        Events are stored in preallocated arrays as loop positions; an
+        overdub appends after the existing events, so undo only moves the
+        event count. Notes still held when a pass ends get a note-off at
+        the end of the loop, so every recorded note ends; notes crossing
+        the loop boundary ring into the next cycle until their note-off.
+        Whatever is still sounding is released when playback stops or the
+        loop is cleared.
+
+        Args:
+            transport: Transport the loop is locked to
+            midi_listener: MidiListener that plays the loop back
+            bars: Loop length in bars
+            quantize: Default quantization of actions
+            capacity: Maximum number of events
+        """
+        super().__init__(transport, bars, quantize)
+        self.midi_listener = midi_listener
+        self.positions = np.zeros(capacity, dtype=np.int64)  # Loop position of each event
+        self.recorded_at = np.zeros(capacity, dtype=np.int64)  # Stream frame it was recorded at
+        self.messages = np.zeros((capacity, 3), dtype=np.uint8)
+        self.count = 0
+        self.undo_count = 0
+        self.dropped = 0  # Events not recorded because the track was full
+
+        self._scheduled_until = None
+        self._held = HeldNotes(midi_listener)
+        self._recording_held = set()  # {(channel, note)} notes recorded without a note-off yet
+        self._record_lock = threading.Lock()  # Recording and closing a pass both append events
+
+    def _clear_content(self):
+        self.count = 0
+        self.undo_count = 0
+        self._scheduled_until = None
+        self._recording_held.clear()
+        self._held.release()
+
+    def _snapshot(self):
+        self.undo_count = self.count
+
+    def _swap_undo(self):
+        self.count, self.undo_count = self.undo_count, self.count
+
+    def record_message(self, msg, frame):
+        """Store a message if the track is recording at `frame`."""
+        if not self.is_recording(frame):
+            return
+
+        with self._record_lock:
+            if not self._append(msg, frame):
+                return
+
+            status, note = msg[0], msg[1]
+            if status & 0xF0 == NOTEON and msg[2] > 0:
+                self._recording_held.add((status & 0x0F, note))
+            elif status & 0xF0 in (NOTEON, NOTEOFF):
+                self._recording_held.discard((status & 0x0F, note))
+
+    def _append(self, msg, frame):
+        if self.count >= len(self.positions):
+            self.dropped += 1
+            return False
+
+        i = self.count
+        self.positions[i] = self.loop_position(frame)
+        self.recorded_at[i] = frame
+        self.messages[i, :len(msg)] = msg[:3]
+        self.count = i + 1
+        return True
+
+    def _close_pass(self):
+        """Record note-offs at the loop end for notes held when the pass ended."""
+        if not self._recording_held or self.record_stop is None:
+            return
+        if self.transport.sound_player.frame_time < self.record_stop:
+            return  # Still recording; live messages may yet arrive
+
+        with self._record_lock:
+            for channel, note in sorted(self._recording_held):
+                self._append((NOTEOFF | channel, note, 0), self.record_stop - 1)
+            self._recording_held.clear()
+
+    def dispatch(self, horizon):
+        """Post the events falling before `horizon` (scheduling thread)."""
+        self._close_pass()
+        if self.play_start is None:
+            return
+
+        start = max(self._scheduled_until or self.play_start, self.play_start)
+        end = horizon if self.play_stop is None else min(horizon, self.play_stop)
+        if start < end:
+            count = self.count
+            order = np.argsort(self.positions[:count], kind='stable')
+            positions = self.positions[order]
+            recorded_at = self.recorded_at[order]
+            first_cycle = (start - self.anchor) // self.length
+            last_cycle = (end - 1 - self.anchor) // self.length
+            for cycle in range(first_cycle, last_cycle + 1):
+                frames = self.anchor + cycle * self.length + positions
+                # Skip the pass that recorded an event: it already sounded live
+                selected = (frames >= start) & (frames < end) & (frames > recorded_at)
+                for i, frame in zip(order[selected], frames[selected]):
+                    self._held.send(tuple(int(x) for x in self.messages[i]), int(frame))
+
+        if self.play_stop is not None and self.play_stop <= horizon and self._held:
+            self._held.release(self.play_stop)
+        self._scheduled_until = max(start, end)
+
+class Looper:
+    def __init__(self, sound_player, midi_listener=None, tempo=120.0, beats_per_bar=4, lookahead_blocks=2):
+        """
+        Initialize the looper.
+
+        Audio tracks run inside an output tap: each block is copied into a
+        preallocated input buffer, recorded from there, and the loops are
+        added to the output. MIDI tracks record every message the listener
+        receives and are played back by a scheduling thread woken by the
+        audio clock, like the Sequencer.
+
+        Args:
+            sound_player: SoundPlayer to loop
+            midi_listener: MidiListener for MIDI tracks (optional)
+            tempo: Tempo in BPM
+            beats_per_bar: Beats per bar
+            lookahead_blocks: Scheduling lookahead for MIDI playback
+        """
+        self.sound_player = sound_player
+        self.midi_listener = midi_listener
+        self.transport = Transport(sound_player, tempo, beats_per_bar)
+        self.lookahead_blocks = lookahead_blocks
+        self.audio_tracks = []
+        self.midi_tracks = []
+
+        self._input = np.zeros(max(sound_player.blocksize, 4096), dtype=np.float32)
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        sound_player.add_output_tap(self._tap)
+        sound_player.add_block_listener(self._on_block)
+        if midi_listener is not None:
+            midi_listener.add_message_listener(self._on_message)
+
+    def add_audio_track(self, bars=4, quantize='bar'):
+        """Create an audio loop track of `bars` bars."""
+        track = AudioLoopTrack(self.transport, bars, quantize)
+        self.audio_tracks = self.audio_tracks + [track]
+        return track
+
+    def add_midi_track(self, bars=4, quantize='bar', capacity=4096):
+        """Create a MIDI loop track of `bars` bars."""
+        if self.midi_listener is None:
+            raise ValueError("MIDI tracks need a MidiListener")
+        track = MidiLoopTrack(self.transport, self.midi_listener, bars, quantize, capacity)
+        self.midi_tracks = self.midi_tracks + [track]
+        return track
+
+    def close(self):
+        """Stop the looper and unregister it."""
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.sound_player.remove_output_tap(self._tap)
+        self.sound_player.remove_block_listener(self._on_block)
+        if self.midi_listener is not None:
+            self.midi_listener.remove_message_listener(self._on_message)
+
+    def _tap(self, block, block_start):
+        """Output tap: record and play the audio tracks (audio thread)."""
+        if not self.audio_tracks:
+            return
+
+        n = min(len(block), len(self._input))
+        inp = self._input[:n]
+        inp[:] = block[:n]
+        for track in self.audio_tracks:
+            track.process(inp, block[:n], block_start)
+
+    def _on_message(self, msg, at_sample):
+        """Message listener: record into the MIDI tracks."""
+        if threading.current_thread() is self._thread:
+            return  # Loop playback, not a performance
+        frame = self.sound_player.frame_time if at_sample is None else at_sample
+        for track in self.midi_tracks:
+            track.record_message(msg, frame)
+
+    def _on_block(self, frame_time, frames):
+        if self.midi_tracks:
+            self._wake.set()
+
+    def _run(self):
+        """Scheduling thread for MIDI track playback."""
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            horizon = self.sound_player.frame_time + self.lookahead_blocks * self.sound_player.blocksize
+            for track in self.midi_tracks:
+                track.dispatch(horizon)
@@ -0,0 +1,163 @@
+import bisect
+import struct
+
+DEFAULT_TEMPO = 500000  # Microseconds per beat (120 BPM)
+
+class TempoMap:
+    def __init__(self, ticks_per_beat=480, changes=None, ticks_per_second=None):
+        """
+        Initialize tempo map.
+
+        Args:
+            ticks_per_beat: Resolution of the file (PPQN)
+            changes: List of (tick, microseconds_per_beat) tempo changes
+            ticks_per_second: Fixed SMPTE resolution, overrides tempo changes
+        """
+        self.ticks_per_beat = ticks_per_beat
+        self.ticks_per_second = ticks_per_second
+
+        # Build sorted segments starting at tick 0: [(tick, tempo, seconds)]
+        tempos = {0: DEFAULT_TEMPO}
+        for tick, tempo in sorted(changes or []):
+            tempos[tick] = tempo
+
+        self.ticks = []
+        self.tempos = []
+        self.seconds = []
+        elapsed = 0.0
+        for tick in sorted(tempos):
+            if self.ticks:
+                elapsed += self._segment_seconds(tick - self.ticks[-1], self.tempos[-1])
+            self.ticks.append(tick)
+            self.tempos.append(tempos[tick])
+            self.seconds.append(elapsed)
+
+    def _segment_seconds(self, ticks, tempo):
+        if self.ticks_per_second:
+            return ticks / self.ticks_per_second
+        return ticks * tempo / (self.ticks_per_beat * 1e6)
+
+    def tick_to_seconds(self, tick):
+        """Convert an absolute tick to seconds."""
+        i = bisect.bisect_right(self.ticks, tick) - 1
+        return self.seconds[i] + self._segment_seconds(tick - self.ticks[i], self.tempos[i])
+
+    def seconds_to_tick(self, seconds):
+        """Convert seconds to the (fractional) absolute tick."""
+        i = bisect.bisect_right(self.seconds, seconds) - 1
+        if self.ticks_per_second:
+            per_tick = 1.0 / self.ticks_per_second
+        else:
+            per_tick = self.tempos[i] / (self.ticks_per_beat * 1e6)
+        return self.ticks[i] + (seconds - self.seconds[i]) / per_tick
+
+    def tempo_at(self, tick):
+        """Get the tempo in BPM at an absolute tick."""
+        i = bisect.bisect_right(self.ticks, tick) - 1
+        return 60e6 / self.tempos[i]
+
+def _read_varlen(data, pos):
+    """Read a variable-length quantity, returning (value, new_pos)."""
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+def _read_track(data):
+    """Parse one MTrk chunk into [(tick, msg)] plus tempo changes."""
+    events = []
+    tempos = []
+    tick = 0
+    pos = 0
+    status = None
+
+    while pos < len(data):
+        delta, pos = _read_varlen(data, pos)
+        tick += delta
+
+        byte = data[pos]
+        if byte & 0x80:
+            pos += 1
+        elif status is None:
+            raise ValueError("Running status without a preceding status byte")
+        else:
+            byte = status  # Running status
+
+        if byte == 0xFF:
+            meta_type = data[pos]
+            length, pos = _read_varlen(data, pos + 1)
+            if meta_type == 0x51 and length == 3:
+                tempos.append((tick, int.from_bytes(data[pos:pos + 3], 'big')))
+            pos += length
+            if meta_type == 0x2F:
+                break
+        elif byte in (0xF0, 0xF7):
+            length, pos = _read_varlen(data, pos)
+            pos += length
+        else:
+            status = byte
+            size = 1 if byte & 0xF0 in (0xC0, 0xD0) else 2
+            events.append((tick, (byte,) + tuple(data[pos:pos + size])))
+            pos += size
+
+    return events, tempos
+
+def read_midi_file(path):
+    """
+    Read a Standard MIDI File (format 0 or 1).
+
+    Args:
+        path: Path to the .mid file
+
+    Returns:
+        (tempo_map, events) where events is a list of (tick, msg) sorted by tick
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data[:4] != b'MThd':
+        raise ValueError(f"Not a Standard MIDI File: {path}")
+
+    header_len = struct.unpack('>I', data[4:8])[0]
+    fmt, ntracks, division = struct.unpack('>HHH', data[8:14])
+    if fmt == 2:
+        raise ValueError("MIDI file format 2 is not supported")
+
+    events = []
+    tempos = []
+    pos = 8 + header_len
+    for track in range(ntracks):
+        chunk_type = data[pos:pos + 4]
+        length = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 8 + length
+        if chunk_type != b'MTrk':
+            continue
+
+        track_events, track_tempos = _read_track(chunk)
+        # Keep the track index so simultaneous events stay in file order
+        events.extend((tick, track, i, msg) for i, (tick, msg) in enumerate(track_events))
+        tempos.extend(track_tempos)
+
+    if division & 0x8000:
+        # SMPTE timing: -frames_per_second in the high byte, ticks per frame in the low byte
+        fps = 256 - (division >> 8)
+        tempo_map = TempoMap(ticks_per_second=fps * (division & 0xFF))
+    else:
+        tempo_map = TempoMap(division, tempos)
+
+    events.sort()
+    return tempo_map, [(tick, msg) for tick, _, _, msg in events]
+
+def load_midi_events(path):
+    """
+    Load a Standard MIDI File as a list of timed messages.
+
+    Returns:
+        (tempo_map, events) where events is a list of (seconds, msg)
+    """
+    tempo_map, events = read_midi_file(path)
+    return tempo_map, [(tempo_map.tick_to_seconds(tick), msg) for tick, msg in events]
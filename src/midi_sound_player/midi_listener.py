@@ -2,44 +2,81 @@ from rtmidi2 import MidiIn, NOTEON, NOTEOFF, CC, splitchannel
 from .sound_player import SoundPlayer
 from .utils import note_to_freq
 
+PITCHBEND = 0xE0
+SUSTAIN = 64
+
 class MidiListener:
-    def __init__(self, sound_library, port=1):
+    def __init__(self, sound_library, port=1, sound_player=None, midi_input=None):
         """
         Initialize MIDI listener.
         
         Args:
             sound_library: SoundLibrary instance
-            port: MIDI input port (default=1)
+            port: MIDI input port (default=1, None to skip opening a port
+                and only receive messages through handle_message)
+            sound_player: SoundPlayer to drive (default=None, creates one)
+            midi_input: Object with the rtmidi2.MidiIn interface used instead
+                of a hardware port (default=None, uses MidiIn)
         """
         self.sound_library = sound_library
-        self.sound_player = SoundPlayer()
+        self.sound_player = sound_player if sound_player is not None else SoundPlayer()
         self.active_notes = {}  # {note: sound_instance}
+        self.sustained_notes = {}  # {channel: [(sound_instance, frame)]} released while the pedal is down
+        self.message_listeners = []  # Called as fn(msg, at_sample) for every message
         
-        self.midiin = MidiIn()
-        self.midiin.open_port(port=port)
-        self.midiin.callback = self._midi_callback
+        self.midiin = None
+        if port is not None:
+            self.midiin = midi_input if midi_input is not None else MidiIn()
+            self.midiin.open_port(port=port)
+            self.midiin.callback = self._midi_callback
         
     def _midi_callback(self, msg, timestamp):
         """Process incoming MIDI messages."""
+        self.handle_message(msg)
+    
+    def handle_message(self, msg, at_sample=None):
+        """
+        Process a single MIDI message.
+        
+        Args:
+            msg: Raw MIDI message (status, data1, data2)
+            at_sample: Stream frame at which the message takes effect
+                (default=None, as soon as possible)
+        """
+        for listener in list(self.message_listeners):
+            listener(msg, at_sample)
+        
         msgtype, channel = splitchannel(msg[0])
         
         if msgtype == NOTEON:
             note, velocity = msg[1], msg[2]
             if velocity > 0:
-                self._handle_note_on(channel, note, velocity)
+                self._handle_note_on(channel, note, velocity, at_sample)
             else:
                 # Note-on with velocity 0 is equivalent to note-off
-                self._handle_note_off(channel, note)
+                self._handle_note_off(channel, note, at_sample)
                 
         elif msgtype == NOTEOFF:
             note, velocity = msg[1], msg[2]
-            self._handle_note_off(channel, note)
+            self._handle_note_off(channel, note, at_sample)
             
         elif msgtype == CC:
             cc, value = msg[1], msg[2]
-            self._handle_cc(channel, cc, value)
+            self._handle_cc(channel, cc, value, at_sample)
+            
+        elif msgtype == PITCHBEND:
+            self._handle_pitch_bend(channel, msg[1] | (msg[2] << 7), at_sample)
+    
+    def add_message_listener(self, listener):
+        """Register a function called as listener(msg, at_sample) for every message."""
+        self.message_listeners.append(listener)
+    
+    def remove_message_listener(self, listener):
+        """Unregister a message listener."""
+        if listener in self.message_listeners:
+            self.message_listeners.remove(listener)
     
-    def _handle_note_on(self, channel, note, velocity):
+    def _handle_note_on(self, channel, note, velocity, at_sample=None):
         """Handle note-on events."""
         # Get the configured sound for this channel
         sound_path = self.sound_library.get_sound(channel)
@@ -54,32 +91,60 @@ class MidiListener:
             sound_path, 
             freq=freq, 
             volume=velocity/127.0, 
-            loop=False
+            loop=False,
+            channel=channel,
+            at_sample=at_sample
         )
         
         # Store the sound instance so we can stop it later
         self.active_notes[(channel, note)] = sound_instance
     
-    def _handle_note_off(self, channel, note):
+    def _handle_note_off(self, channel, note, at_sample=None):
         """Handle note-off events."""
         # Find and stop the corresponding note
         key = (channel, note)
         if key in self.active_notes:
-            self.sound_player.stop_sound(self.active_notes[key])
-            del self.active_notes[key]
+            sound_instance = self.active_notes.pop(key)
+            controls = self.sound_player.channel_controls.get(channel)
+            frame_time = self.sound_player.frame_time
+            frame = frame_time if at_sample is None else at_sample
+            down, release = controls.sustain_at(frame, frame_time) if controls is not None else (False, None)
+            if not down:
+                self.sound_player.stop_sound(sound_instance, at_sample)
+            elif release is not None:
+                # The pedal release is already scheduled
+                self.sound_player.stop_sound(sound_instance, release)
+            else:
+                # Keep ringing until the sustain pedal is released
+                self.sustained_notes.setdefault(channel, []).append((sound_instance, frame))
     
-    def _handle_cc(self, channel, cc, value):
+    def _handle_cc(self, channel, cc, value, at_sample=None):
         """Handle control change events."""
-        # Implement control change handling (e.g., volume, modulation)
-        # This is a basic implementation that can be expanded
-        if cc == 7:  # Volume
-            self._set_channel_volume(channel, value/127.0)
+        # Controllers are posted to the channel with their frame and applied
+        # by the mixer at that block, so no sample data is recomputed
+        controls = self.sound_player.get_channel_controls(channel)
+        if cc == 1:  # Modulation wheel
+            controls.post('modulation', value/127.0, at_sample)
+        elif cc == 7:  # Volume
+            self._set_channel_volume(channel, value/127.0, at_sample)
+        elif cc == 11:  # Expression
+            controls.post('expression', value/127.0, at_sample)
+        elif cc == 64:  # Sustain pedal
+            # Applied at its frame: note-offs before it are not held, or still held
+            frame_time = self.sound_player.frame_time
+            controls.post_sustain(value >= 64, at_sample, frame_time)
+            if value < 64:
+                release = frame_time if at_sample is None else at_sample
+                for sound_instance, frame in self.sustained_notes.pop(channel, []):
+                    self.sound_player.stop_sound(sound_instance, at_sample if frame <= release else frame)
+    
+    def _handle_pitch_bend(self, channel, value, at_sample=None):
+        """Handle pitch bend events (14-bit value, center 8192)."""
+        self.sound_player.get_channel_controls(channel).set_pitch_bend(value, at_sample)
     
-    def _set_channel_volume(self, channel, volume):
-        """Set volume for all active notes on channel."""
-        for (ch, note), sound_instance in self.active_notes.items():
-            if ch == channel:
-                self.sound_player.set_volume(sound_instance, volume)
+    def _set_channel_volume(self, channel, volume, at_sample=None):
+        """Set volume for all notes on channel."""
+        self.sound_player.get_channel_controls(channel).post('volume', volume, at_sample)
     
     def close(self):
         """Clean up resources."""
@@ -87,6 +152,55 @@ class MidiListener:
         for sound_instance in self.active_notes.values():
             self.sound_player.stop_sound(sound_instance)
         self.active_notes.clear()
+        for sound_instances in self.sustained_notes.values():
+            for sound_instance, frame in sound_instances:
+                self.sound_player.stop_sound(sound_instance)
+        self.sustained_notes.clear()
         
         # Close MIDI port
-        self.midiin.close_port()
\ No newline at end of file
+        if self.midiin is not None:
+            self.midiin.close_port()
+
+class HeldNotes:
+    def __init__(self, midi_listener):
+        """
+        Track the notes and sustain pedals a player has sent to a listener.
+
+        Players that post scheduled messages (the Sequencer and MIDI loop
+        tracks) send through this, so whatever is still held when they
+        stop, seek or wrap can be released.
+
+        Args:
+            midi_listener: MidiListener the messages are sent to
+        """
+        self.midi_listener = midi_listener
+        self.notes = set()  # {(channel, note)} notes sent but not yet released
+        self.sustained = set()  # {channel} channels with the sustain pedal down
+
+    def __len__(self):
+        return len(self.notes) + len(self.sustained)
+
+    def send(self, msg, at_sample=None):
+        """Send one message to the listener and track what it holds."""
+        msgtype, channel = splitchannel(msg[0])
+        if msgtype == NOTEON and msg[2] > 0:
+            self.notes.add((channel, msg[1]))
+        elif msgtype in (NOTEON, NOTEOFF):
+            self.notes.discard((channel, msg[1]))
+        elif msgtype == CC and msg[1] == SUSTAIN:
+            if msg[2] >= 64:
+                self.sustained.add(channel)
+            else:
+                self.sustained.discard(channel)
+
+        self.midi_listener.handle_message(msg, at_sample=at_sample)
+
+    def release(self, at_sample=None):
+        """Send note-off for every held note and lift held sustain pedals."""
+        for channel, note in sorted(self.notes):
+            self.midi_listener.handle_message((NOTEOFF | channel, note, 0), at_sample=at_sample)
+        self.notes.clear()
+
+        for channel in sorted(self.sustained):
+            self.midi_listener.handle_message((CC | channel, SUSTAIN, 0), at_sample=at_sample)
+        self.sustained.clear()
\ No newline at end of file
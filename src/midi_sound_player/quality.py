@@ -0,0 +1,189 @@
+QUALITY_STEPS = ('interpolation', 'voices', 'effects')  # In the order they are taken
+
+class QualityController:
+    def __init__(self, sound_player, high_load=0.75, low_load=0.4, smoothing=0.2,
+                 degrade_blocks=4, restore_blocks=200, voice_fraction=0.75, min_voices=4):
+        """
+        Initialize an adaptive quality controller.
+
+        After every block the controller compares the audio callback time
+        with the block deadline. While the smoothed load stays above
+        `high_load` it takes one degradation step at a time, in the order
+        of QUALITY_STEPS:
+
+        1. 'interpolation': variable-rate voices read the nearest sample
+           instead of interpolating linearly
+        2. 'voices': the voice count is capped below the current count and
+           the quietest voices are faded out
+        3. 'effects': the most expensive effects are bypassed until their
+           cost brings the load halfway between the thresholds; the bus
+           crossfades them out
+
+        A step that would change nothing right now (no variable-rate
+        voices, too few voices to cap, no effects) is passed over for the
+        next one. Once the load stays below `low_load` for
+        `restore_blocks` blocks, the last step taken is undone. The gap
+        between the two thresholds and the longer restore wait keep the
+        controller from oscillating.
+
+        Args:
+            sound_player: SoundPlayer to control
+            high_load: Load (callback time / deadline) that triggers a step
+            low_load: Load below which a step is undone
+            smoothing: Weight of the newest block in the smoothed load
+            degrade_blocks: Blocks over `high_load` before the next step
+            restore_blocks: Blocks under `low_load` before a step is undone
+            voice_fraction: Share of the current voices kept by the voice cap
+            min_voices: The voice cap never goes below this
+        """
+        self.sound_player = sound_player
+        self.high_load = high_load
+        self.low_load = low_load
+        self.smoothing = smoothing
+        self.degrade_blocks = degrade_blocks
+        self.restore_blocks = restore_blocks
+        self.voice_fraction = voice_fraction
+        self.min_voices = min_voices
+
+        self.steps = []  # Steps taken, in order
+        self.load = 0.0  # Smoothed load
+        self._over = 0
+        self._under = 0
+        self._last_callback = sound_player.callback_count
+        self._last_underflows = sound_player.underflows
+        self._bypassed = []  # Effects bypassed by the controller
+
+        # 'changed' counts what the step acted on: voices switched to nearest
+        # sample reads, voices faded out, or effects bypassed
+        self.stats = {step: {'degraded': 0, 'restored': 0, 'blocks': 0, 'changed': 0} for step in QUALITY_STEPS}
+
+        sound_player.add_block_listener(self._on_block)
+
+    def close(self):
+        """Restore full quality and unregister the controller."""
+        self.sound_player.remove_block_listener(self._on_block)
+        while self.steps:
+            self._restore()
+
+    @property
+    def level(self):
+        """Number of steps taken."""
+        return len(self.steps)
+
+    def get_stats(self):
+        """
+        Get the controller statistics.
+
+        Returns:
+            Dict with the current level and load, and for each step the
+            number of times it was taken and undone, what it changed and
+            the blocks spent with it active
+        """
+        stats = {
+            'level': self.level,
+            'active_steps': list(self.steps),
+            'load': self.load,
+            'dropped_voices': self.sound_player.dropped_voices,
+            'bypassed_effects': len(self._bypassed)
+        }
+        for step, step_stats in self.stats.items():
+            stats[step] = dict(step_stats)
+        return stats
+
+    def _on_block(self, frame_time, frames):
+        player = self.sound_player
+        # Only blocks rendered by the stream callback have a time
+        if player.callback_count == self._last_callback:
+            return
+        self._last_callback = player.callback_count
+
+        load = player.callback_time / player.get_deadline(frames)
+        self.load += (load - self.load) * self.smoothing
+
+        for step in self.steps:
+            self.stats[step]['blocks'] += 1
+
+        # An underflow means the deadline was already missed
+        underflow = player.underflows != self._last_underflows
+        self._last_underflows = player.underflows
+
+        if underflow or self.load > self.high_load:
+            self._under = 0
+            self._over += 1
+            if self._over >= self.degrade_blocks:
+                self._degrade()
+                self._over = 0
+        elif self.load < self.low_load:
+            self._over = 0
+            self._under += 1
+            if self._under >= self.restore_blocks and self.level:
+                self._restore()
+                self._under = 0
+        else:
+            self._over = 0
+            self._under = 0
+
+    def _degrade(self):
+        """Take the next step that changes something."""
+        first = QUALITY_STEPS.index(self.steps[-1]) + 1 if self.steps else 0
+        for step in QUALITY_STEPS[first:]:
+            changed = self._apply(step)
+            if changed:
+                self.steps.append(step)
+                self.stats[step]['degraded'] += 1
+                self.stats[step]['changed'] += changed
+                return
+
+    def _apply(self, step):
+        """Apply a step; returns how many voices or effects it changed."""
+        player = self.sound_player
+        if step == 'interpolation':
+            variable = [instance for instance in list(player.instances.values())
+                        if instance['rate'] != 1.0 or self._channel_bends(instance['channel'])]
+            if variable:
+                player.interpolation = 'nearest'
+            return len(variable)
+
+        if step == 'voices':
+            voices = len(player.instances)
+            cap = max(self.min_voices, int(voices * self.voice_fraction))
+            if cap >= voices:
+                return 0
+            player.max_voices = cap
+            return voices - cap
+
+        # 'effects': bypass the most expensive first, until enough time is saved
+        deadline = player.get_deadline()
+        excess = (self.load - (self.high_load + self.low_load) / 2) * deadline
+        buses = [player.master_bus] + [bus for channel, bus in list(player.channel_buses.items())]
+        costs = sorted(((bus.effect_cpu_times.get(effect, 0.0), effect)
+                        for bus in buses for effect in list(bus.effects) if not effect.bypass),
+                       key=lambda item: -item[0])
+        saved = 0.0
+        for cost, effect in costs:
+            # At least one effect goes, even when an underflow triggered the step
+            if cost <= 0.0 or (self._bypassed and saved >= excess):
+                break
+            effect.bypass = True
+            self._bypassed.append(effect)
+            saved += cost
+        return len(self._bypassed)
+
+    def _channel_bends(self, channel):
+        """Whether pitch bend or modulation change the rate of a channel's voices."""
+        controls = self.sound_player.channel_controls.get(channel)
+        return controls is not None and (controls.pitch_bend.value != 0 or controls.modulation.value > 0)
+
+    def _restore(self):
+        player = self.sound_player
+        step = self.steps.pop()
+        if step == 'interpolation':
+            player.interpolation = 'linear'
+        elif step == 'voices':
+            player.max_voices = None
+        elif step == 'effects':
+            for effect in self._bypassed:
+                effect.bypass = False
+            self._bypassed = []
+
+        self.stats[step]['restored'] += 1
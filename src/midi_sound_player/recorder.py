@@ -0,0 +1,205 @@
+import threading
+
+import numpy as np
+import soundfile as sf
+
+class RingBuffer:
+    def __init__(self, capacity):
+        """
+        Preallocated single-producer/single-consumer ring buffer.
+
+        The writer only advances `write_index` and the reader only
+        advances `read_index`, so no lock is needed between one audio
+        thread and one worker thread.
+
+        Args:
+            capacity: Size in frames
+        """
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.float32)
+        self.write_index = 0  # Total frames written
+        self.read_index = 0  # Total frames read
+
+    def available(self):
+        """Frames waiting to be read."""
+        return self.write_index - self.read_index
+
+    def free(self):
+        """Frames that can be written without overwriting unread data."""
+        return self.capacity - self.available()
+
+    def write(self, data):
+        """
+        Copy frames in without allocating.
+
+        Returns:
+            False (and writes nothing) if there is not enough free space
+        """
+        n = len(data)
+        if n > self.free():
+            return False
+
+        start = self.write_index % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = data[:first]
+        self.buffer[:n - first] = data[first:]
+        self.write_index += n
+        return True
+
+    def read(self, out):
+        """
+        Copy up to len(out) frames into `out`.
+
+        Returns:
+            Number of frames read
+        """
+        n = min(len(out), self.available())
+        start = self.read_index % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        out[first:n] = self.buffer[:n - first]
+        self.read_index += n
+        return n
+
+class Recorder:
+    def __init__(self, sound_player, buffer_seconds=10.0, chunk_frames=65536):
+        """
+        Initialize a recorder for the master output.
+
+        An output tap copies each mixed block into a preallocated ring
+        buffer on the audio thread. A writer thread drains the buffer to
+        disk through soundfile in chunks of up to `chunk_frames`. If the
+        writer falls behind and the buffer is full, the block is dropped
+        and counted in `overflows` instead of blocking the audio thread.
+
+        Args:
+            sound_player: SoundPlayer to record
+            buffer_seconds: Ring buffer size in seconds
+            chunk_frames: Frames written to the file per write call
+        """
+        self.sound_player = sound_player
+        self.ring = RingBuffer(int(buffer_seconds * sound_player.sample_rate))
+        # A chunk larger than half the buffer would only be drained when full
+        self.chunk = np.zeros(min(chunk_frames, self.ring.capacity // 2), dtype=np.float32)
+
+        self.recording = False
+        self.overflows = 0  # Frames dropped because the ring buffer was full
+        self.frames_written = 0
+        self.start_frame = None
+        self.stop_frame = None
+
+        self._file = None
+        self._finished = False  # Set by the tap once stop_frame is reached
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, path, at_sample=None, subtype=None):
+        """
+        Start recording to a file.
+
+        Args:
+            path: Output path; the format follows the extension (.wav, .flac...)
+            at_sample: Stream frame of the first recorded sample
+                (default=None, the next block)
+            subtype: soundfile subtype, e.g. 'PCM_24' or 'FLOAT' (optional)
+        """
+        if self.recording:
+            raise RuntimeError("Recorder is already recording")
+
+        self._file = sf.SoundFile(path, mode='w', samplerate=self.sound_player.sample_rate,
+                                  channels=1, subtype=subtype)
+        self.ring.read_index = self.ring.write_index = 0
+        self.overflows = 0
+        self.frames_written = 0
+        self.start_frame = self.sound_player.frame_time if at_sample is None else at_sample
+        self.stop_frame = None
+        self._finished = False
+        self.recording = True
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+        self.sound_player.add_output_tap(self._tap)
+
+    def stop(self, at_sample=None, wait=True):
+        """
+        Stop recording.
+
+        Args:
+            at_sample: Stream frame after the last recorded sample
+                (default=None, the current frame). A frame that has already
+                been played is still honoured as long as those frames have
+                not been flushed to disk yet (less than chunk_frames ago).
+                If the stream is not running, the recording ends with the
+                last rendered block.
+            wait: Block until the file is complete and closed
+        """
+        if not self.recording:
+            return
+
+        self.stop_frame = self.sound_player.frame_time if at_sample is None else at_sample
+        if self.stop_frame <= self.sound_player.frame_time or not self._stream_running():
+            # Every block before the stop frame has already been tapped,
+            # or no further block will be
+            self._finished = True
+        self._wake.set()
+        if wait:
+            self.wait()
+
+    def wait(self, timeout=None):
+        """Block until the writer thread has closed the file."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _stream_running(self):
+        """Whether the player's stream will render more blocks."""
+        stream = self.sound_player.stream
+        return stream is not None and getattr(stream, 'active', True)
+
+    def _tap(self, block, block_start):
+        """Output tap: copy the recorded part of the block (audio thread)."""
+        if self._finished:
+            return
+
+        start = max(self.start_frame - block_start, 0)
+        end = len(block)
+        last = False
+        if self.stop_frame is not None and self.stop_frame - block_start <= end:
+            end = max(self.stop_frame - block_start, 0)
+            last = True
+
+        if start < end and not self.ring.write(block[start:end]):
+            self.overflows += end - start
+
+        # Only flag the end once the final block is in the ring, so the
+        # writer cannot close the file before draining it
+        if last:
+            self._finished = True
+        self._wake.set()
+
+    def _write_loop(self):
+        """Writer thread: drain the ring buffer to the file."""
+        chunk_frames = len(self.chunk)
+        while True:
+            self._wake.wait(0.1)
+            self._wake.clear()
+
+            if self.stop_frame is not None and not self._finished and not self._stream_running():
+                # The stream stopped before reaching the stop frame
+                self._finished = True
+
+            finished = self._finished
+            while self.ring.available() >= chunk_frames or (finished and self.ring.available()):
+                n = self.ring.read(self.chunk)
+                if self.stop_frame is not None:
+                    # Drop anything captured past a stop frame set late
+                    n = max(min(n, self.stop_frame - self.start_frame - self.frames_written), 0)
+                self._file.write(self.chunk[:n])
+                self.frames_written += n
+
+            if finished:
+                break
+
+        self.sound_player.remove_output_tap(self._tap)
+        self._file.close()
+        self._file = None
+        self.recording = False
@@ -0,0 +1,144 @@
+import json
+import os
+import struct
+
+import numpy as np
+import scipy.signal as signal
+
+from .utils import read_mono, render_variants
+
+MAGIC = b'MSPBANK1'
+PAGE_SIZE = 4096  # Alignment of the data section
+ARRAY_ALIGN = 64  # Alignment of each array inside the data section
+
+def _align(value, alignment):
+    return -(-value // alignment) * alignment
+
+def compile_bank(sound_library, bank_file, sample_rate=44100, notes=None, sounds=None,
+                 pitch_mode='resample', workers=None):
+    """
+    Compile a sound library into a single sample bank file.
+
+    The bank holds the channel assignments, every sound decoded to mono
+    float32 at `sample_rate`, and optional pitched variants. A JSON index
+    is followed by a page-aligned data section, so SampleBank can map it
+    with np.memmap and play straight from the mapped pages.
+
+    Args:
+        sound_library: SoundLibrary to compile
+        bank_file: Output path
+        sample_rate: Sample rate the data is converted to
+        notes: MIDI notes to precompute pitched variants for (optional)
+        sounds: Sound names to include (default=None, all available sounds)
+        pitch_mode: How variants are pitched, 'resample' or 'phase_vocoder'
+        workers: Worker processes used to render variants (default=None, one per CPU)
+
+    Returns:
+        The bank index
+    """
+    names = sorted(sounds if sounds is not None else sound_library.available_sounds)
+
+    # Pitched variants are only needed for sounds assigned to a channel
+    assigned = set(sound_library.channel_sounds.values())
+
+    arrays = []
+    index = {
+        'sample_rate': sample_rate,
+        'pitch_mode': pitch_mode,
+        'sounds_dir': str(sound_library.sounds_dir) if sound_library.sounds_dir else None,
+        'channel_sounds': {},
+        'sounds': {}
+    }
+
+    offset = 0
+    def add_array(data):
+        nonlocal offset
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        entry = {'offset': offset, 'length': len(data)}
+        arrays.append((offset, data))
+        offset = _align(offset + data.nbytes, ARRAY_ALIGN)
+        return entry
+
+    for name in names:
+        filepath = sound_library.available_sounds[name]
+        data, sr = read_mono(filepath)
+        if sr != sample_rate:
+            data = signal.resample_poly(data, sample_rate, sr)
+
+        entry = add_array(data)
+        entry['path'] = filepath
+        entry['variants'] = {}
+        if notes is not None and filepath in assigned:
+            for note, pitched in render_variants(data, sample_rate, notes, pitch_mode, workers).items():
+                entry['variants'][str(note)] = add_array(pitched)
+        index['sounds'][name] = entry
+
+    for channel, filepath in sound_library.channel_sounds.items():
+        for name in names:
+            if sound_library.available_sounds[name] == filepath:
+                index['channel_sounds'][str(channel)] = name
+                break
+
+    header = json.dumps(index).encode('utf-8')
+    data_offset = _align(len(MAGIC) + 8 + len(header), PAGE_SIZE)
+
+    with open(bank_file, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for array_offset, data in arrays:
+            f.seek(data_offset + array_offset)
+            f.write(data.astype('<f4').tobytes())
+        f.truncate(data_offset + offset)
+
+    return index
+
+class SampleBank:
+    def __init__(self, bank_file):
+        """
+        Open a compiled sample bank.
+
+        The data section is mapped read-only, so opening is nearly free
+        and the pages are shared by every process using the same bank.
+
+        Args:
+            bank_file: Path written by compile_bank
+        """
+        self.bank_file = str(bank_file)
+
+        with open(bank_file, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a sample bank: {bank_file}")
+            header_len = struct.unpack('<Q', f.read(8))[0]
+            self.index = json.loads(f.read(header_len).decode('utf-8'))
+
+        self.sample_rate = self.index['sample_rate']
+        self.pitch_mode = self.index.get('pitch_mode', 'resample')
+        self.sounds_dir = self.index['sounds_dir']
+        self.sound_paths = {name: entry['path'] for name, entry in self.index['sounds'].items()}
+
+        data_offset = _align(len(MAGIC) + 8 + header_len, PAGE_SIZE)
+        if os.path.getsize(self.bank_file) > data_offset:
+            self.data = np.memmap(self.bank_file, dtype='<f4', mode='r', offset=data_offset)
+        else:
+            self.data = np.zeros(0, dtype='<f4')  # Empty bank, nothing to map
+
+    def _view(self, entry):
+        start = entry['offset'] // 4
+        return self.data[start:start + entry['length']]
+
+    def get_channel_sounds(self):
+        """Get the compiled channel assignments as {channel: sound name}."""
+        return {int(channel): name for channel, name in self.index['channel_sounds'].items()}
+
+    def get_sound(self, name):
+        """Get the sample data of a sound as a memory-mapped view."""
+        return self._view(self.index['sounds'][name])
+
+    def get_variant_notes(self, name):
+        """Get the MIDI notes with a precomputed variant for a sound."""
+        return [int(note) for note in self.index['sounds'][name]['variants']]
+
+    def get_variant(self, name, note):
+        """Get a precomputed pitched variant as a memory-mapped view."""
+        return self._view(self.index['sounds'][name]['variants'][str(note)])
@@ -0,0 +1,227 @@
+import bisect
+import threading
+
+from .midi_file import TempoMap, load_midi_events
+from .midi_listener import HeldNotes
+
+class Sequencer:
+    def __init__(self, midi_listener, events=None, lookahead_blocks=2):
+        """
+        Initialize sequencer.
+
+        Events are scheduled ahead of the audio clock: after every block the
+        player wakes the sequencer thread, which posts every event falling
+        inside the lookahead window to the listener with its exact stream
+        frame. Timing is therefore sample-accurate and independent of when
+        the thread actually runs.
+
+        Args:
+            midi_listener: MidiListener the events are played through
+            events: Optional list of (seconds, msg) events
+            lookahead_blocks: How many blocks ahead of the clock to schedule
+        """
+        self.midi_listener = midi_listener
+        self.sound_player = midi_listener.sound_player
+        self.lookahead_blocks = lookahead_blocks
+        self.tempo_map = TempoMap()
+        self.events = []  # [(seconds, msg)] sorted by time
+        self.event_times = []
+        self.loop_range = None  # (start_seconds, end_seconds)
+        self.playing = False
+        self.finished = threading.Event()
+
+        self._anchor_time = 0.0  # Song position at _anchor_frame
+        self._anchor_frame = 0
+        self._cursor = 0
+        self._end_frame = None  # Frame of the last event once it has been posted
+        self._held = HeldNotes(midi_listener)
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+
+        self.sound_player.add_block_listener(self._on_block)
+
+        if events:
+            self.load_events(events)
+
+    @classmethod
+    def from_midi_file(cls, midi_listener, path, **kwargs):
+        """Create a sequencer playing a Standard MIDI File."""
+        sequencer = cls(midi_listener, **kwargs)
+        sequencer.load_midi_file(path)
+        return sequencer
+
+    def load_midi_file(self, path):
+        """Load a Standard MIDI File, replacing the current events."""
+        tempo_map, events = load_midi_events(path)
+        self.load_events(events)
+        self.tempo_map = tempo_map
+
+    def load_events(self, events):
+        """
+        Load a recorded event list, replacing the current events.
+
+        Args:
+            events: Iterable of (seconds, msg) where msg is a raw MIDI message
+        """
+        with self._lock:
+            self._held.release()
+            self.events = sorted(((float(t), tuple(msg)) for t, msg in events), key=lambda e: e[0])
+            self.event_times = [t for t, _ in self.events]
+            self.tempo_map = TempoMap()
+            self._anchor_time = 0.0
+            self._cursor = 0
+            self._end_frame = None
+            self.finished.clear()
+
+    @property
+    def duration(self):
+        """Time of the last event in seconds."""
+        return self.event_times[-1] if self.event_times else 0.0
+
+    @property
+    def position(self):
+        """Current song position in seconds."""
+        with self._lock:
+            if not self.playing:
+                return self._anchor_time
+            elapsed = self.sound_player.frame_time - self._anchor_frame
+            return self._anchor_time + max(elapsed, 0) / self.sound_player.sample_rate
+
+    def set_loop(self, start, end):
+        """
+        Loop playback between two song positions.
+
+        Args:
+            start: Loop start in seconds
+            end: Loop end in seconds
+        """
+        if (end - start) * self.sound_player.sample_rate < 1:
+            raise ValueError(f"Invalid loop range: {start}-{end}")
+
+        with self._lock:
+            self.loop_range = (start, end)
+
+    def clear_loop(self):
+        """Disable looping."""
+        with self._lock:
+            self.loop_range = None
+
+    def play(self):
+        """Start (or resume) playback from the current position."""
+        with self._lock:
+            if self.playing:
+                return
+
+            self._anchor_frame = self._next_frame()
+            self._end_frame = None
+            self.playing = True
+            self.finished.clear()
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+        self.sound_player.start()
+        self._wake.set()
+
+    def stop(self):
+        """Stop playback, keeping the current position, and release held notes."""
+        with self._lock:
+            if self.playing:
+                self._anchor_time = self.position
+                self.playing = False
+                self._end_frame = None
+            # Notes left ringing at the end of the events are released here too
+            self._held.release()
+
+    def seek(self, seconds):
+        """Move the playback position to a song position in seconds."""
+        with self._lock:
+            self._held.release()
+            self._anchor_time = max(seconds, 0.0)
+            self._anchor_frame = self._next_frame()
+            self._cursor = bisect.bisect_left(self.event_times, self._anchor_time)
+            self._end_frame = None
+            self.finished.clear()
+
+        self._wake.set()
+
+    def wait(self, timeout=None):
+        """Block until playback reaches the end of the events."""
+        return self.finished.wait(timeout)
+
+    def close(self):
+        """Stop playback and release resources."""
+        self.stop()
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sound_player.remove_block_listener(self._on_block)
+
+    def _next_frame(self):
+        """First stream frame that is safe to schedule on."""
+        return self.sound_player.frame_time + self.sound_player.blocksize
+
+    def _song_to_frame(self, seconds):
+        """Convert a song position to a stream frame."""
+        offset = (seconds - self._anchor_time) * self.sound_player.sample_rate
+        return self._anchor_frame + int(round(offset))
+
+    def _on_block(self, frame_time, frames):
+        """Block listener: wake the scheduling thread, or finish once the last event was rendered."""
+        if not self.playing:
+            return
+
+        end_frame = self._end_frame
+        if end_frame is None:
+            self._wake.set()
+        elif frame_time > end_frame:
+            self._end_frame = None
+            self._anchor_time = self.duration
+            self.playing = False
+            self.finished.set()
+
+    def _run(self):
+        """Scheduling thread, driven by the audio clock."""
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            self._dispatch()
+
+    def _dispatch(self):
+        """Post every event inside the lookahead window."""
+        with self._lock:
+            if not self.playing or self._end_frame is not None:
+                return
+
+            horizon = self.sound_player.frame_time + self.lookahead_blocks * self.sound_player.blocksize
+            while True:
+                loop_end = self.loop_range[1] if self.loop_range else None
+
+                if self._cursor < len(self.events) and (loop_end is None or self.event_times[self._cursor] < loop_end):
+                    seconds, msg = self.events[self._cursor]
+                    frame = self._song_to_frame(seconds)
+                    if frame >= horizon:
+                        break
+                    self._held.send(msg, frame)
+                    self._cursor += 1
+
+                elif loop_end is not None:
+                    # Wrap around: release hanging notes and re-anchor at the loop start
+                    end_frame = self._song_to_frame(loop_end)
+                    if end_frame >= horizon:
+                        break
+                    self._held.release(end_frame)
+                    self._anchor_frame = end_frame
+                    self._anchor_time = self.loop_range[0]
+                    self._cursor = bisect.bisect_left(self.event_times, self._anchor_time)
+
+                else:
+                    # End of the events; the block listener finishes once the
+                    # audio reaches the last one. Held notes ring until stop or seek
+                    self._end_frame = self._song_to_frame(self.duration)
+                    break
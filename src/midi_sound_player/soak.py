@@ -0,0 +1,325 @@
+import math
+import os
+import queue
+import random
+import threading
+import time
+from functools import partial
+
+import numpy as np
+
+from .backends import NullOutputStream
+from .midi_listener import MidiListener
+from .sound_player import SoundPlayer
+
+DEFAULT_THRESHOLDS = {
+    'dropped': 0,  # Events lost because the input queue was full
+    'late': 0,  # Events that waited in the input queue longer than the tolerance
+    'timer_lag': 0.02,  # Largest delay, in seconds, of an event reaching the input queue
+    'errors': 0,  # Events whose handling raised an exception
+    'overruns': None,  # Callbacks slower than their (speed-scaled) deadline; reported
+                       # only, since the output buffer absorbs single slow callbacks
+    'underflows': 0,  # Blocks the backend received after they were due (audible dropouts)
+    'memory_growth_mb': 64.0  # RSS growth after the warmup, beyond the growth of the sample caches
+}
+
+def chord_storm(duration=10.0, chords_per_second=8.0, chord_size=6, low=36, high=96, channel=0, seed=0):
+    """
+    Generate dense random chords.
+
+    Returns:
+        List of (seconds, msg) events
+    """
+    rng = random.Random(seed)
+    events = []
+    period = 1.0 / chords_per_second
+    t = 0.0
+    while t < duration:
+        for note in rng.sample(range(low, high + 1), chord_size):
+            events.append((t, (0x90 | channel, note, rng.randint(40, 127))))
+            events.append((t + period * 0.9, (0x80 | channel, note, 0)))
+        t += period
+    return sorted(events, key=lambda e: e[0])
+
+def trill_storm(duration=10.0, notes_per_second=30.0, notes=(60, 62), channel=0):
+    """
+    Generate a fast trill alternating between notes.
+
+    Returns:
+        List of (seconds, msg) events
+    """
+    events = []
+    period = 1.0 / notes_per_second
+    i = 0
+    while i * period < duration:
+        t = i * period
+        note = notes[i % len(notes)]
+        events.append((t, (0x90 | channel, note, 100)))
+        events.append((t + period * 0.8, (0x80 | channel, note, 0)))
+        i += 1
+    return sorted(events, key=lambda e: e[0])
+
+def cc_sweep_storm(duration=10.0, messages_per_second=200.0, controllers=(1, 7, 11), channel=0):
+    """
+    Generate continuous controller and pitch bend sweeps.
+
+    Returns:
+        List of (seconds, msg) events
+    """
+    events = []
+    period = 1.0 / messages_per_second
+    i = 0
+    while i * period < duration:
+        t = i * period
+        value = abs((i % 254) - 127)  # Triangle wave 127..0..127
+        events.append((t, (0xB0 | channel, controllers[i % len(controllers)], value)))
+        bend = value * 129
+        events.append((t, (0xE0 | channel, bend & 0x7F, bend >> 7)))
+        i += 1
+    return events
+
+def mixed_storm(duration=10.0, channel=0, seed=0):
+    """
+    Generate chords, trills and controller sweeps at the same time.
+
+    Returns:
+        List of (seconds, msg) events
+    """
+    events = (chord_storm(duration, channel=channel, seed=seed)
+              + trill_storm(duration, notes=(72, 74), channel=channel)
+              + cc_sweep_storm(duration, channel=channel))
+    return sorted(events, key=lambda e: e[0])
+
+def _cache_bytes(sound_player):
+    """Bytes held by the sample caches of a player, excluding memory-mapped banks."""
+    arrays = [data for data, sr in list(sound_player.sounds.values())]
+    arrays += list(sound_player.variants.values())
+    return sum(data.nbytes for data in arrays if not isinstance(data, np.memmap))
+
+def _rss_bytes():
+    """Resident set size of this process."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class VirtualMidiSource:
+    def __init__(self, events, speed=1.0, queue_size=1024, late_tolerance=0.01):
+        """
+        Local MIDI source with the rtmidi2.MidiIn interface.
+
+        A timing thread pushes each event into a bounded queue at its time
+        (divided by `speed`), and a delivery thread calls `callback`, like
+        rtmidi does for a hardware port. Events that find the queue full
+        are dropped. Lateness is measured from the moment an event is
+        queued, so it reflects how fast the player takes events in, not
+        how precisely the timing thread woke up; events delivered more
+        than `late_tolerance` seconds after they were queued are counted
+        as late. The timing thread's own delay is kept in `max_timer_lag`. Exceptions raised by `callback` are counted as errors.
+
+        Args:
+            events: List of (seconds, msg) events
+            speed: Replay speed relative to the event times
+            queue_size: Capacity of the input queue
+            late_tolerance: Allowed delivery delay in seconds; the default
+                is twice the interpreter's 5 ms thread switch interval, the
+                delay any thread may see while others hold the GIL
+        """
+        self.events = sorted(events, key=lambda e: e[0])
+        self.speed = speed
+        self.late_tolerance = late_tolerance
+        self.callback = None
+
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.late = 0
+        self.errors = 0
+        self.max_lateness = 0.0
+        self.max_timer_lag = 0.0  # Largest wake-up delay of the timing thread
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self.done = threading.Event()
+        self._threads = []
+
+    def open_port(self, port=0):
+        """Accepted for MidiIn compatibility."""
+
+    def close_port(self):
+        """Stop replaying."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def start(self):
+        """Start replaying the events."""
+        self._threads = [
+            threading.Thread(target=self._produce, daemon=True),
+            threading.Thread(target=self._deliver, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def wait(self, timeout=None):
+        """Block until every event has been delivered or dropped."""
+        return self.done.wait(timeout)
+
+    def _produce(self):
+        start = time.perf_counter()
+        for seconds, msg in self.events:
+            due = start + seconds / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0 and self._stop.wait(delay):
+                break
+
+            self.sent += 1
+            queued = time.perf_counter()
+            self.max_timer_lag = max(self.max_timer_lag, queued - due)
+            try:
+                self._queue.put_nowait((queued, msg))
+            except queue.Full:
+                self.dropped += 1
+
+        self._queue.put(None)
+
+    def _deliver(self):
+        last = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+
+                queued, msg = item
+                now = time.perf_counter()
+                lateness = now - queued
+                self.max_lateness = max(self.max_lateness, lateness)
+                if lateness > self.late_tolerance:
+                    self.late += 1
+
+                if self.callback is not None:
+                    try:
+                        self.callback(msg, 0.0 if last is None else now - last)
+                    except Exception:
+                        self.errors += 1
+                self.delivered += 1
+                last = now
+        finally:
+            self.done.set()
+
+class SoakTest:
+    def __init__(self, sound_library, events, speed=1.0, sample_rate=44100, blocksize=512,
+                 thresholds=None, sample_interval=1.0, late_tolerance=0.01, warmup=None,
+                 buffer_time=0.05):
+        """
+        Initialize a soak test.
+
+        The events are replayed by a VirtualMidiSource into a MidiListener
+        whose SoundPlayer renders to a NullOutputStream. Audio and MIDI
+        both run `speed` times faster than real time. Callback deadlines
+        are scaled by `speed`, and the output buffer spans `buffer_time`
+        seconds of wall-clock time, so it absorbs the same scheduling
+        jitter at any speed.
+
+        Args:
+            sound_library: SoundLibrary with channel assignments
+            events: List of (seconds, msg) events (see the *_storm functions)
+            speed: Replay speed, e.g. 1 to 50
+            sample_rate: Output sample rate
+            blocksize: Output block size
+            thresholds: Dict overriding DEFAULT_THRESHOLDS
+            sample_interval: Seconds between memory samples
+            late_tolerance: Allowed delivery delay in seconds
+            warmup: Wall-clock seconds before the memory baseline is taken,
+                so start-up allocations do not count as growth (default=None,
+                half the run: growth is measured over the second half). The
+                sample caches are always excluded
+            buffer_time: Wall-clock length of the output buffer in seconds
+        """
+        self.sound_library = sound_library
+        self.events = events
+        self.speed = speed
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.sample_interval = sample_interval
+        self.late_tolerance = late_tolerance
+        self.warmup = warmup
+        self.buffer_time = buffer_time
+        self.peak_voices = 0
+
+    def _on_block(self, frame_time, frames):
+        self.peak_voices = max(self.peak_voices, len(self.sound_player.instances))
+
+    def run(self):
+        """
+        Run the test.
+
+        Returns:
+            Report dict; report['failures'] lists the exceeded thresholds
+        """
+        self.peak_voices = 0
+        block_time = self.blocksize / self.sample_rate / self.speed
+        buffer_blocks = max(2, math.ceil(self.buffer_time / block_time))
+        self.sound_player = SoundPlayer(
+            sample_rate=self.sample_rate,
+            blocksize=self.blocksize,
+            backend=partial(NullOutputStream, speed=self.speed, buffer_blocks=buffer_blocks)
+        )
+        source = VirtualMidiSource(self.events, self.speed, late_tolerance=self.late_tolerance)
+        listener = MidiListener(self.sound_library, port=0, sound_player=self.sound_player, midi_input=source)
+        self.sound_player.add_block_listener(self._on_block)
+
+        memory = []
+        start = time.perf_counter()
+        try:
+            self.sound_player.start()
+            source.start()
+            while True:
+                memory.append((time.perf_counter() - start, _rss_bytes(), _cache_bytes(self.sound_player)))
+                if source.wait(self.sample_interval):
+                    break
+            memory.append((time.perf_counter() - start, _rss_bytes(), _cache_bytes(self.sound_player)))
+        finally:
+            listener.close()
+            self.sound_player.cleanup()
+
+        # Filling the sample caches is expected; only growth beyond it counts
+        warmup = memory[-1][0] / 2 if self.warmup is None else self.warmup
+        baseline = next((sample for sample in memory if sample[0] >= warmup), memory[-1])
+        cache_growth = memory[-1][2] - baseline[2]
+        report = {
+            'events': len(self.events),
+            'delivered': source.delivered,
+            'dropped': source.dropped,
+            'late': source.late,
+            'errors': source.errors,
+            'max_lateness': source.max_lateness,
+            'timer_lag': source.max_timer_lag,
+            'peak_voices': self.peak_voices,
+            'memory_growth_mb': (memory[-1][1] - baseline[1] - cache_growth) / 2 ** 20,
+            'cache_growth_mb': cache_growth / 2 ** 20,
+            'memory_samples': memory,
+            'wall_time': time.perf_counter() - start
+        }
+        report.update(self.sound_player.get_callback_stats())
+        report['failures'] = check_thresholds(report, self.thresholds)
+        return report
+
+def check_thresholds(report, thresholds=None):
+    """
+    Compare a soak report against thresholds.
+
+    Returns:
+        List of failure descriptions (empty if everything passed)
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    failures = []
+    for name, limit in thresholds.items():
+        if limit is not None and report.get(name, 0) > limit:
+            failures.append(f"{name}: {report[name]} > {limit}")
+    return failures
@@ -30,6 +30,28 @@ class SoundLibrary:
             name = str(rel_path.with_suffix(""))
             self.available_sounds[name] = str(file_path)
     
+    def index_sounds_directory(self, directory=None):
+        """
+        Build an index of the sound files in a directory.
+        
+        Returns:
+            {name: (filepath, mtime_ns, size)}
+        """
+        directory = Path(directory or self.sounds_dir)
+        index = {}
+        for file_path in directory.glob("**/*.wav"):
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue  # Removed while scanning
+            name = str(file_path.relative_to(directory).with_suffix(""))
+            index[name] = (str(file_path), stat.st_mtime_ns, stat.st_size)
+        return index
+    
+    def set_available_sounds(self, available_sounds):
+        """Replace the available sounds in one step ({name: filepath})."""
+        self.available_sounds = dict(available_sounds)
+    
     def get_available_sounds(self):
         """Get list of available sounds."""
         return list(self.available_sounds.keys())
@@ -84,4 +106,16 @@ class SoundLibrary:
         for channel_str, sound_name in config.get("channel_sounds", {}).items():
             channel = int(channel_str)
             if sound_name in self.available_sounds:
-                self.channel_sounds[channel] = self.available_sounds[sound_name]
\ No newline at end of file
+                self.channel_sounds[channel] = self.available_sounds[sound_name]
+    
+    def load_bank(self, bank):
+        """
+        Load sounds and channel assignments from a compiled SampleBank.
+        
+        The directory is not scanned; sound paths come from the bank index.
+        """
+        self.sounds_dir = bank.sounds_dir
+        self.available_sounds.update(bank.sound_paths)
+        
+        for channel, sound_name in bank.get_channel_sounds().items():
+            self.channel_sounds[channel] = self.available_sounds[sound_name]
\ No newline at end of file
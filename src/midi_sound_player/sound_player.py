@@ -1,164 +1,736 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 import sounddevice as sd
-import soundfile as sf
 import numpy as np
-from .utils import resample
+from .controllers import ChannelControls
+from .effects import EffectBus
+from .utils import PITCH_MODES, note_to_freq, pitch_ratio, pitch_shift, read_mono, render_variants, resample
 
 class SoundPlayer:
-    def __init__(self, sample_rate=44100, blocksize=1024, device=None):
+    def __init__(self, sample_rate=44100, blocksize=1024, device=None,
+                 latency=None, backend=None, pitch_mode='resample',
+                 progressive=True, render_workers=2):
         """
         Initialize sound player.
-        
+
+        All sound instances are mixed into a single output stream. The
+        stream clock (`frame_time`) counts the frames rendered so far, so
+        instances can be started and stopped at sample-accurate positions.
+
         Args:
             sample_rate: Output sample rate (default=44100)
             blocksize: Output buffer size (default=1024)
             device: Output device (default=None, uses system default)
+            latency: Stream latency, seconds or 'low'/'high' (default=None,
+                uses the sounddevice default)
+            backend: Output stream class (default=None, uses
+                sounddevice.OutputStream; see backends.NullOutputStream)
+            pitch_mode: How sounds are pitched, 'resample' (changes
+                duration) or 'phase_vocoder' (keeps duration)
+            progressive: Start notes without a cached variant at once and
+                render the variant in the background (default=True). With
+                'resample' the source is read at the pitch ratio meanwhile;
+                with 'phase_vocoder' the first `prefix_frames` of the
+                variant are rendered at note-on and longer starts of it
+                follow from the background, ahead of playback
+            render_workers: Threads rendering variants in the background
         """
+        if pitch_mode not in PITCH_MODES:
+            raise ValueError(f"Unknown pitch mode: {pitch_mode}")
+
         self.sample_rate = sample_rate
         self.blocksize = blocksize
         self.device = device
+        self.latency = latency
+        self.backend = backend
+        self.pitch_mode = pitch_mode
         self.sounds = {}  # Cache for loaded sounds
+        self.variants = {}  # Cache for pitched sounds {(filepath, freq): data}
+        self.progressive = progressive
+        self.render_workers = render_workers
+        self.pending_variants = {}  # Variants being rendered {(filepath, freq): (source, Future, stages)}
+        self.prefix_frames = 16 * blocksize  # Phase vocoder frames rendered at note-on
+        self._render_pool = None
         self.instances = {}  # Active sound instances
         self.next_id = 0
-    
+
+        # Quality settings, lowered under load (see quality.QualityController)
+        self.interpolation = 'linear'  # 'linear' or 'nearest' for variable-rate voices
+        self.max_voices = None  # Quietest voices beyond this are faded out
+        self.dropped_voices = 0
+        self.fade_frames = max(blocksize, int(sample_rate * 0.01))  # Fade-out length of dropped voices
+
+        self.frame_time = 0  # Frames rendered since the stream started
+        self.block_listeners = []  # Called as fn(frame_time, frames) after each block
+        self.output_taps = []  # Called as fn(block, block_start) with each mixed block
+        self.stream = None
+        self.clock_speed = 1.0  # Stream clock relative to real time (NullOutputStream speed)
+        self.reset_callback_stats()
+        self._mix_buffer = np.zeros(blocksize, dtype=np.float32)
+
+        # Controller state (pitch bend, modulation, volume...) per MIDI channel
+        self.channel_controls = {}  # {channel: ChannelControls}
+
+        # Effect buses: one optional bus per MIDI channel and a master bus
+        self.channel_buses = {}  # {channel: EffectBus}
+        self.master_bus = EffectBus(sample_rate=sample_rate, blocksize=blocksize)
+
+    @classmethod
+    def calibrated(cls, device=None, config_file=None, **kwargs):
+        """
+        Create a player using the saved calibration for a device.
+
+        Falls back to the default settings when the device has not been
+        calibrated (see calibration.LatencyCalibrator).
+        """
+        from .calibration import load_calibration
+
+        settings = load_calibration(device, config_file)
+        if settings:
+            kwargs.setdefault('sample_rate', settings['sample_rate'])
+            kwargs.setdefault('blocksize', settings['blocksize'])
+            kwargs.setdefault('latency', settings['latency'])
+        return cls(device=device, **kwargs)
+
     def load_sound(self, filepath):
         """Load sound file into memory."""
         if filepath in self.sounds:
             return self.sounds[filepath]
-            
-        data, sr = sf.read(filepath, dtype='float32')
-        
-        # Convert stereo to mono if needed
-        if len(data.shape) > 1 and data.shape[1] > 1:
-            data = np.mean(data, axis=1)
-        
+
+        data, sr = read_mono(filepath)
+
         # Cache the sound data and its sample rate
+        source = (data, sr)
+        self.sounds[filepath] = source
+        return source
+
+    def load_bank(self, bank):
+        """
+        Serve sounds and pitched variants from a compiled SampleBank.
+
+        The cache entries are views of the bank's memory map, so no sample
+        data is decoded or copied.
+        """
+        if bank.sample_rate != self.sample_rate:
+            raise ValueError(f"Bank sample rate {bank.sample_rate} does not match player rate {self.sample_rate}")
+
+        for name, filepath in bank.sound_paths.items():
+            self.sounds[filepath] = (bank.get_sound(name), bank.sample_rate)
+            if bank.pitch_mode != self.pitch_mode:
+                continue
+            for note in bank.get_variant_notes(name):
+                self.variants[(filepath, self._freq_key(note_to_freq(note)))] = bank.get_variant(name, note)
+
+    def replace_sound(self, filepath, data, sr, variants=None):
+        """
+        Swap in new sample data for a sound.
+
+        Each cache is replaced with a single assignment, so the audio and
+        MIDI threads never wait. Playing instances keep a reference to the
+        old data and finish with it. Renders of the old data still in
+        flight are forgotten, so later notes do not wait for them.
+
+        Args:
+            filepath: Path the sound is cached under
+            data: New float32 sample data
+            sr: Sample rate of the data
+            variants: Pitched variants of the new data as {freq: data}
+        """
+        new_variants = {key: value for key, value in list(self.variants.items()) if key[0] != filepath}
+        for freq, pitched in (variants or {}).items():
+            new_variants[(filepath, self._freq_key(freq))] = pitched
+
         self.sounds[filepath] = (data, sr)
-        return data, sr
-    
-    def play_sound(self, filepath, freq=None, volume=1.0, loop=False):
+        self.variants = new_variants
+        self._forget_pending(filepath)
+
+    def invalidate_sound(self, filepath):
+        """Drop a sound and its pitched variants from the caches."""
+        self.sounds.pop(filepath, None)
+        self.variants = {key: value for key, value in list(self.variants.items()) if key[0] != filepath}
+        self._forget_pending(filepath)
+
+    def _forget_pending(self, filepath):
+        """Drop the in-flight renders of a sound; instances already waiting keep theirs."""
+        self.pending_variants = {key: value for key, value in list(self.pending_variants.items())
+                                 if key[0] != filepath}
+
+    def get_cached_freqs(self, filepath):
+        """Get the frequencies with a cached pitched variant of a sound."""
+        return [freq for path, freq in list(self.variants) if path == filepath]
+
+    def get_variant(self, filepath, freq=None):
+        """
+        Get a sound pitched to a frequency, resampling on a cache miss.
+
+        Args:
+            filepath: Path to sound file
+            freq: Target frequency (default=None, the unpitched sound)
+
+        Returns:
+            float32 sample data
+        """
+        source = self.load_sound(filepath)
+        if freq is None:
+            return source[0]
+
+        key = (filepath, self._freq_key(freq))
+        pitched = self.variants.get(key)
+        if pitched is None:
+            pitched = self.render_variant(source[0], source[1], freq)
+            self._store_variant(key, source, pitched)
+        return pitched
+
+    def render_variant(self, data, sr, freq):
+        """Pitch sample data to a frequency using the player's pitch mode."""
+        if self.pitch_mode == 'phase_vocoder':
+            pitched = pitch_shift(data, sr, freq)
+        else:
+            pitched = resample(data, sr, freq)
+        return np.asarray(pitched, dtype=np.float32)
+
+    def prerender(self, filepath, notes, workers=None):
+        """
+        Render the pitched variants of a sound for a range of notes.
+
+        The notes are rendered in parallel on a process pool and stored in
+        the variant cache, so later note-ons do not resample.
+
+        Args:
+            filepath: Path to sound file
+            notes: Iterable of MIDI notes
+            workers: Number of worker processes (default=None, one per CPU)
+        """
+        data, sr = self.load_sound(filepath)
+        notes = [note for note in notes
+                 if (filepath, self._freq_key(note_to_freq(note))) not in self.variants]
+
+        for note, pitched in render_variants(data, sr, notes, self.pitch_mode, workers).items():
+            self.variants[(filepath, self._freq_key(note_to_freq(note)))] = pitched
+
+    def render_variant_async(self, filepath, freq):
+        """
+        Render a pitched variant on the background worker pool.
+
+        The finished variant is stored in the variant cache. Concurrent
+        requests for the same variant of the same sound data share one
+        render; a render of data that has since been replaced is not shared.
+
+        Returns:
+            concurrent.futures.Future resolving to the float32 variant data
+        """
+        return self._pending_render(filepath, freq)[0]
+
+    def _pending_render(self, filepath, freq):
+        """Start or join the background render of a variant; returns (future, stages)."""
+        key = (filepath, self._freq_key(freq))
+        source = self.load_sound(filepath)
+        pending = self.pending_variants.get(key)
+        if pending is not None and pending[0] is source:
+            return pending[1:]
+
+        if self._render_pool is None:
+            self._render_pool = ThreadPoolExecutor(max_workers=self.render_workers,
+                                                   thread_name_prefix='variant-render')
+        stages = []  # Longer and longer starts of a phase vocoder variant
+        future = self._render_pool.submit(self._render_and_cache, key, source, freq, stages)
+        self.pending_variants[key] = (source, future, stages)
+        return future, stages
+
+    def _render_and_cache(self, key, source, freq, stages):
+        try:
+            if self.pitch_mode == 'phase_vocoder':
+                # Each stage is rendered in a fraction of the time it plays
+                # for, so notes started from a prefix never run out
+                frames = 4 * self.prefix_frames
+                while frames < len(source[0]):
+                    stages.append(self._render_prefix(source, freq, frames))
+                    frames *= 4
+            pitched = self.render_variant(source[0], source[1], freq)
+            self._store_variant(key, source, pitched)
+            return pitched
+        finally:
+            pending = self.pending_variants.get(key)
+            if pending is not None and pending[0] is source:
+                self.pending_variants.pop(key, None)
+
+    def _store_variant(self, key, source, pitched):
+        """
+        Cache a variant rendered from `source`, unless the sound was replaced.
+
+        replace_sound swaps the sound before the variants, so checking
+        again after the store catches a replacement that happened in
+        between; the stale entry is then dropped and rendered again later.
+        """
+        filepath = key[0]
+        if self.sounds.get(filepath) is not source:
+            return
+        variants = self.variants
+        variants[key] = pitched
+        if self.sounds.get(filepath) is not source:
+            variants.pop(key, None)
+
+    def _render_prefix(self, source, freq, frames):
+        """Render the first `frames` of a phase vocoder variant."""
+        data, sr = source
+        # One STFT frame more than needed, so the kept part has no edge effects
+        return self.render_variant(data[:frames + 2048], sr, freq)[:frames]
+
+    @staticmethod
+    def _freq_key(freq):
+        """Cache key for a frequency, tolerant to float rounding."""
+        return round(freq, 3)
+
+    def play_sound(self, filepath, freq=None, volume=1.0, loop=False,
+                   channel=None, at_sample=None):
         """
         Start playing a sound.
-        
+
         Args:
             filepath: Path to sound file
             freq: Target frequency (for pitch shifting)
             volume: Playback volume (0.0-1.0)
             loop: Whether to loop the sound
-            
+            channel: MIDI channel the sound belongs to (optional)
+            at_sample: Stream frame at which playback starts (default=None,
+                starts with the next block)
+
         Returns:
             sound_id: ID of the sound instance
         """
-        # Load the sound file
-        data, sr = self.load_sound(filepath)
-        
-        # Resample if frequency is specified
-        if freq is not None:
-            data = resample(data, sr, freq)
-        
-        # Apply volume
-        data = data * volume
-        
-        # Create a streaming instance
+        rate = 1.0
+        pending = None
+        stages = None
+        variant_scale = 1.0
+        fallback = None
+        key = (filepath, self._freq_key(freq)) if freq is not None else None
+        source = self.load_sound(filepath)
+        if (key is None or key in self.variants or not self.progressive
+                or (self.pitch_mode == 'phase_vocoder' and len(source[0]) <= self.prefix_frames)):
+            data = self.get_variant(filepath, freq)
+        elif self.pitch_mode == 'resample':
+            # Cache miss: play the source at the pitch ratio, which the mixer
+            # interpolates block by block, until the variant has rendered.
+            # The variant advances 1/rate frames per source frame
+            data = source[0]
+            rate = pitch_ratio(freq)
+            variant_scale = 1.0 / rate
+            pending = self.render_variant_async(filepath, freq)
+        else:
+            # The phase vocoder keeps the duration, so its renders line up
+            # 1:1 with each other: render the start now and longer parts in
+            # the background. Should they fall behind, the source read at
+            # the pitch ratio bridges the gap
+            data = self._render_prefix(source, freq, self.prefix_frames)
+            fallback = (source[0], pitch_ratio(freq))
+            pending, stages = self._pending_render(filepath, freq)
+
         instance_id = self._get_next_id()
         self.instances[instance_id] = {
             'data': data,
             'position': 0,
+            'rate': rate,  # Base playback rate, scaled by the channel controls
+            'pending': pending,  # Future of the variant replacing `data`
+            'stages': stages,  # Longer starts of the variant, as they are rendered
+            'variant_scale': variant_scale,  # Position in the variant per position in `data`
+            'fallback': fallback,  # (data, rate) to continue from if `data` ends before `pending`
             'volume': volume,
             'loop': loop,
             'active': True,
-            'stream': None
+            'channel': channel,
+            'start': at_sample,
+            'stop_at': None,
+            'fade_out': None  # Frames left of a fade-out before the instance ends
         }
-        
-        # Start the audio stream
-        stream = sd.OutputStream(
+
+        # Make sure the shared output stream is running
+        self.start()
+
+        return instance_id
+
+    def start(self):
+        """Open and start the shared output stream if it is not running."""
+        if self.stream is not None:
+            return
+
+        backend = self.backend or sd.OutputStream
+        self.stream = backend(
             samplerate=self.sample_rate,
             blocksize=self.blocksize,
             channels=1,
-            callback=lambda outdata, frames, time, status: 
-                self._audio_callback(outdata, frames, time, status, instance_id),
-            device=self.device
+            callback=self._audio_callback,
+            device=self.device,
+            latency=self.latency
         )
-        
-        self.instances[instance_id]['stream'] = stream
-        stream.start()
-        
-        return instance_id
-    
-    def _audio_callback(self, outdata, frames, time, status, instance_id):
+        self.clock_speed = getattr(self.stream, 'speed', None) or 1.0
+        self.stream.start()
+
+    def get_deadline(self, frames=None):
+        """
+        Get the wall-clock time the stream allows for rendering one block.
+
+        Args:
+            frames: Block length (default=None, the player blocksize)
+
+        Returns:
+            Seconds, scaled by the clock speed of the stream
+        """
+        frames = frames or self.blocksize
+        return frames / self.sample_rate / self.clock_speed
+
+    def reset_callback_stats(self):
+        """Reset audio callback timing statistics."""
+        self.callback_time = 0.0  # Seconds spent in the last callback
+        self.peak_callback_time = 0.0
+        self.total_callback_time = 0.0
+        self.callback_count = 0
+        self.overruns = 0  # Callbacks that took longer than their block
+        self.underflows = 0  # Output underflows reported by the backend
+
+    def get_callback_stats(self):
+        """
+        Get audio callback timing statistics.
+
+        Returns:
+            Dict with callback times (seconds), loads relative to the block
+            deadline, and overrun/underflow counts
+        """
+        deadline = self.get_deadline()
+        mean = self.total_callback_time / self.callback_count if self.callback_count else 0.0
+        return {
+            'callbacks': self.callback_count,
+            'callback_time': self.callback_time,
+            'peak_callback_time': self.peak_callback_time,
+            'mean_callback_time': mean,
+            'load': self.callback_time / deadline,
+            'peak_load': self.peak_callback_time / deadline,
+            'mean_load': mean / deadline,
+            'overruns': self.overruns,
+            'underflows': self.underflows
+        }
+
+    def get_channel_bus(self, channel):
+        """Get the effect bus of a MIDI channel, creating it if needed."""
+        if channel not in self.channel_buses:
+            self.channel_buses[channel] = EffectBus(sample_rate=self.sample_rate, blocksize=self.blocksize)
+        return self.channel_buses[channel]
+
+    def get_channel_controls(self, channel):
+        """Get the controller state of a MIDI channel, creating it if needed."""
+        if channel not in self.channel_controls:
+            self.channel_controls[channel] = ChannelControls()
+        return self.channel_controls[channel]
+
+    def get_effects_stats(self):
+        """
+        Get the CPU cost of effect processing per block.
+
+        Returns:
+            Dict mapping 'master' and each bus channel to EffectBus.get_stats()
+        """
+        deadline = self.get_deadline()
+        stats = {'master': self.master_bus.get_stats(deadline)}
+        for channel, bus in list(self.channel_buses.items()):
+            stats[channel] = bus.get_stats(deadline)
+        return stats
+
+    def add_block_listener(self, listener):
+        """
+        Register a function called after every rendered block.
+
+        The listener runs on the audio thread as listener(frame_time, frames),
+        where frame_time is the first frame of the next block. It must return
+        quickly and must not block.
+        """
+        self.block_listeners.append(listener)
+
+    def remove_block_listener(self, listener):
+        """Unregister a block listener."""
+        if listener in self.block_listeners:
+            self.block_listeners.remove(listener)
+
+    def add_output_tap(self, tap):
+        """
+        Register a function that receives every mixed output block.
+
+        The tap runs on the audio thread as tap(block, block_start), where
+        block_start is the stream frame of block[0]. The block is reused
+        for the next callback, so the tap must copy what it keeps, and it
+        must not block or allocate. Taps may add to the block in place;
+        later taps see the result.
+        """
+        self.output_taps.append(tap)
+
+    def remove_output_tap(self, tap):
+        """Unregister an output tap."""
+        if tap in self.output_taps:
+            self.output_taps.remove(tap)
+
+    def _audio_callback(self, outdata, frames, time_info, status):
         """Audio callback for continuous playback."""
+        start = time.perf_counter()
         if status:
             print(f"Status: {status}")
-            
-        if instance_id not in self.instances or not self.instances[instance_id]['active']:
-            outdata.fill(0)
+            if status.output_underflow:
+                self.underflows += 1
+
+        self.render(frames, outdata[:, 0])
+
+        elapsed = time.perf_counter() - start
+        self.callback_time = elapsed
+        self.peak_callback_time = max(self.peak_callback_time, elapsed)
+        self.total_callback_time += elapsed
+        self.callback_count += 1
+        if elapsed > self.get_deadline(frames):
+            self.overruns += 1
+
+    def render(self, frames, out=None):
+        """
+        Mix all active sound instances into the next block.
+
+        Args:
+            frames: Number of frames to render
+            out: Optional float32 array of length `frames` to write into
+
+        Returns:
+            The mixed block
+        """
+        if len(self._mix_buffer) < frames:
+            self._mix_buffer = np.zeros(frames, dtype=np.float32)
+        mix = self._mix_buffer[:frames]
+        mix.fill(0)
+
+        # Channels with a bus are mixed separately and processed every block,
+        # so effect tails keep ringing after their voices have finished
+        buses = list(self.channel_buses.items())
+        bus_buffers = {channel: bus.begin(frames) for channel, bus in buses}
+
+        # Controllers are evaluated once per block for each channel
+        controls = {}
+        for channel, channel_controls in list(self.channel_controls.items()):
+            rate, gain_start, gain_end = channel_controls.advance(frames, self.sample_rate, self.frame_time)
+            if gain_start != gain_end:
+                gain = np.linspace(gain_start, gain_end, frames, dtype=np.float32)
+            else:
+                gain = gain_end
+            controls[channel] = (rate, gain)
+
+        if self.max_voices is not None and len(self.instances) > self.max_voices:
+            self._drop_quietest_voices()
+
+        block_start = self.frame_time
+        for instance_id, instance in list(self.instances.items()):
+            target = bus_buffers.get(instance['channel'], mix)
+            rate, gain = controls.get(instance['channel'], (1.0, 1.0))
+            if instance['pending'] is not None:
+                self._swap_rendered_variant(instance, frames)
+            rate *= instance['rate']
+            fade = instance['fade_out']
+            if fade is not None:
+                gain = gain * np.clip((fade - np.arange(frames, dtype=np.float32)) / self.fade_frames, 0.0, 1.0)
+                instance['fade_out'] = fade - frames
+            if (not instance['active'] or not self._mix_instance(instance, target, block_start, frames, rate, gain)
+                    or (fade is not None and fade <= frames)):
+                instance['active'] = False
+                self.instances.pop(instance_id, None)
+
+        for channel, bus in buses:
+            mix += bus.process(bus_buffers[channel])
+
+        if self.master_bus.effects:
+            mix[:] = self.master_bus.process(mix)
+
+        for tap in list(self.output_taps):
+            tap(mix, block_start)
+
+        if out is not None:
+            out[:] = mix
+
+        self.frame_time += frames
+        for listener in list(self.block_listeners):
+            listener(self.frame_time, frames)
+
+        return mix
+
+    def _drop_quietest_voices(self):
+        """Fade out the quietest instances beyond max_voices over fade_frames."""
+        voices = [instance for instance in list(self.instances.values()) if instance['fade_out'] is None]
+        excess = len(voices) - self.max_voices
+        if excess <= 0:
             return
-            
-        instance = self.instances[instance_id]
-        
-        # Calculate how much data we need
-        remaining = len(instance['data']) - instance['position']
-        
-        if remaining >= frames:
-            # We have enough data
-            outdata[:] = instance['data'][instance['position']:instance['position']+frames].reshape(-1, 1)
-            instance['position'] += frames
-        elif instance['loop']:
-            # We need to loop
-            # First, copy what's left
-            outdata[:remaining] = instance['data'][instance['position']:].reshape(-1, 1)
-            
-            # Then fill the rest with the beginning of the file, looping as needed
-            to_fill = frames - remaining
-            loops_needed = to_fill // len(instance['data']) + 1
-            
-            for i in range(loops_needed):
-                start = 0
-                end = min(len(instance['data']), to_fill - i * len(instance['data']))
-                if end <= 0:
-                    break
-                    
-                dest_start = remaining + i * len(instance['data'])
-                dest_end = dest_start + (end - start)
-                
-                if dest_end <= len(outdata):
-                    outdata[dest_start:dest_end] = instance['data'][start:end].reshape(-1, 1)
-            
-            instance['position'] = (instance['position'] + frames) % len(instance['data'])
+
+        voices.sort(key=lambda instance: instance['volume'])
+        for instance in voices[:excess]:
+            instance['fade_out'] = self.fade_frames
+            self.dropped_voices += 1
+
+    def _swap_rendered_variant(self, instance, frames):
+        """Switch a progressively started instance to its finished variant."""
+        pending = instance['pending']
+        if not pending.done():
+            fallback = instance['fallback']
+            if fallback is None:
+                return
+
+            # Phase vocoder: continue at the same position in the longest
+            # start rendered so far; if even that is about to run out
+            # (allowing for a bend of up to an octave), in the source
+            stages = instance['stages']
+            if stages and len(stages[-1]) > len(instance['data']):
+                instance['data'] = stages[-1]
+            if len(instance['data']) - instance['position'] < 2 * frames:
+                instance['data'], instance['rate'] = fallback
+                instance['fallback'] = None
+            return
+
+        instance['pending'] = None
+        instance['stages'] = None
+        fallback, instance['fallback'] = instance['fallback'], None
+        if pending.exception() is not None:
+            if fallback is not None:
+                instance['data'], instance['rate'] = fallback
+            return  # Keep playing from the source
+
+        # The same moment of the note is at position * variant_scale
+        data = pending.result()
+        position = int(round(instance['position'] * instance['variant_scale']))
+        if instance['loop'] and len(data):
+            position %= len(data)
+        instance['data'] = data
+        instance['position'] = position
+        instance['rate'] = 1.0
+
+    def _mix_instance(self, instance, mix, block_start, frames, rate=1.0, gain=1.0):
+        """
+        Add one sound instance to the mix buffer.
+
+        Args:
+            instance: Sound instance dict
+            mix: Buffer to add into
+            block_start: Stream frame of the first sample in `mix`
+            frames: Block length
+            rate: Playback rate (1.0 plays the data as it is)
+            gain: Channel gain, a scalar or a per-frame ramp of `frames` values
+
+        Returns:
+            False once the instance has finished playing
+        """
+        data = instance['data']
+        length = len(data)
+
+        # Scheduled start inside (or after) this block
+        offset = 0
+        if instance['start'] is not None:
+            offset = instance['start'] - block_start
+            if offset >= frames:
+                return True
+            offset = max(offset, 0)
+
+        # Scheduled stop inside this block
+        end = frames
+        finished = False
+        stop_at = instance['stop_at']
+        if stop_at is not None and stop_at - block_start < frames:
+            end = max(stop_at - block_start, offset)
+            finished = True
+
+        position = instance['position']
+        volume = instance['volume']
+        if isinstance(gain, np.ndarray):
+            gain = gain[offset:end]
+        volume = volume * gain
+
+        if rate == 1.0 and position == int(position):
+            # Fast path: copy the sample data as it is
+            position = int(position)
+            i = offset
+            while i < end and length:
+                n = min(end - i, length - position)
+                chunk_volume = volume if np.isscalar(volume) else volume[i - offset:i - offset + n]
+                mix[i:i + n] += data[position:position + n] * chunk_volume
+                i += n
+                position += n
+
+                if position >= length:
+                    if not instance['loop']:
+                        finished = True
+                        break
+                    position = 0
+        elif end > offset and length:
+            # Variable rate: read at fractional positions, interpolated
+            # linearly or (cheaper) from the nearest sample
+            positions = position + rate * np.arange(end - offset)
+            if instance['loop']:
+                positions %= length
+            else:
+                valid = np.searchsorted(positions, length - 1, side='right')
+                if valid < len(positions):
+                    positions = positions[:valid]
+                    finished = True
+
+            if self.interpolation == 'nearest':
+                index = (positions + 0.5).astype(np.int64)
+                index[index >= length] = 0 if instance['loop'] else length - 1
+                segment = data[index]
+            else:
+                index = positions.astype(np.int64)
+                frac = (positions - index).astype(np.float32)
+                following = index + 1
+                following[following >= length] = 0 if instance['loop'] else length - 1
+                segment = data[index] + (data[following] - data[index]) * frac
+
+            n = len(segment)
+            chunk_volume = volume if np.isscalar(volume) else volume[:n]
+            mix[offset:offset + n] += segment * chunk_volume
+            position = position + rate * (end - offset)
+            if instance['loop']:
+                position %= length
+
+        instance['position'] = position
+        return not finished and length > 0
+
+    def stop_sound(self, instance_id, at_sample=None):
+        """
+        Stop a sound instance.
+
+        Args:
+            instance_id: ID returned by play_sound
+            at_sample: Stream frame at which to stop (default=None, stops now)
+        """
+        if instance_id not in self.instances:
+            return
+
+        if at_sample is None:
+            instance = self.instances.pop(instance_id, None)
+            if instance is not None:
+                instance['active'] = False
         else:
-            # Not enough data and not looping, so fill with zeros after the remaining data
-            outdata[:remaining] = instance['data'][instance['position']:].reshape(-1, 1)
-            outdata[remaining:].fill(0)
-            
-            # Mark instance as inactive
-            instance['active'] = False
-            instance['stream'].stop()
-    
-    def stop_sound(self, instance_id):
-        """Stop a sound instance."""
-        if instance_id in self.instances:
-            if self.instances[instance_id]['stream']:
-                self.instances[instance_id]['stream'].stop()
-                self.instances[instance_id]['stream'].close()
-            self.instances[instance_id]['active'] = False
-            del self.instances[instance_id]
-    
+            self.instances[instance_id]['stop_at'] = at_sample
+
     def set_volume(self, instance_id, volume):
         """Set volume for a sound instance."""
         if instance_id in self.instances:
-            # Scale the data by the ratio of new volume to old volume
-            old_volume = self.instances[instance_id]['volume']
-            if old_volume > 0:  # Avoid division by zero
-                scale = volume / old_volume
-                self.instances[instance_id]['data'] *= scale
             self.instances[instance_id]['volume'] = volume
-    
+
     def _get_next_id(self):
         """Generate a unique ID for sound instances."""
         self.next_id += 1
         return self.next_id
-    
+
     def cleanup(self):
         """Clean up all resources."""
         for instance_id in list(self.instances.keys()):
             self.stop_sound(instance_id)
-        self.sounds.clear()
\ No newline at end of file
+
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+        if self._render_pool is not None:
+            self._render_pool.shutdown(wait=True, cancel_futures=True)
+            self._render_pool = None
+        self.pending_variants.clear()
+
+        self.sounds.clear()
+        self.variants.clear()
@@ -1,5 +1,10 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import scipy.signal as signal
+import soundfile as sf
+
+PITCH_MODES = ('resample', 'phase_vocoder')
 
 def note_to_freq(note):
     """
@@ -43,17 +48,11 @@ def resample(data, original_sr, target_freq=None, target_note=None):
     if target_freq is None and target_note is None:
         return data
     
-    if target_note is not None:
-        target_freq = note_to_freq(target_note)
-    
     # Determine the original pitch
     # This is a simple implementation; for more accurate pitch detection,
     # consider using a dedicated pitch detection algorithm
     # Here we assume the sound's base frequency is A4 (440 Hz)
-    base_freq = 440.0
-    
-    # Calculate the ratio between target and base frequency
-    ratio = target_freq / base_freq
+    ratio = pitch_ratio(target_freq, target_note)
     
     # Adjust the length of the data
     new_length = int(len(data) / ratio)
@@ -63,6 +62,136 @@ def resample(data, original_sr, target_freq=None, target_note=None):
     
     return resampled
 
+def pitch_ratio(target_freq=None, target_note=None):
+    """Ratio between the target frequency and the assumed A4 base pitch."""
+    if target_note is not None:
+        target_freq = note_to_freq(target_note)
+    return target_freq / 440.0
+
+def pitch_shift(data, original_sr, target_freq=None, target_note=None, n_fft=2048, hop=512):
+    """
+    Shift audio data to a target frequency or note, keeping its duration.
+    
+    The sound is time-stretched by the pitch ratio with a phase vocoder,
+    then resampled back to its original length. All STFT frames are
+    processed at once with array operations.
+    
+    Args:
+        data: Audio data
+        original_sr: Original sample rate
+        target_freq: Target frequency (optional)
+        target_note: Target MIDI note (optional)
+        n_fft: STFT frame size
+        hop: STFT hop size
+        
+    Returns:
+        Pitch-shifted audio data with the same length as `data`
+    """
+    if target_freq is None and target_note is None:
+        return data
+    
+    # Same base pitch assumption as resample()
+    ratio = pitch_ratio(target_freq, target_note)
+    if len(data) == 0 or ratio == 1.0:
+        return data
+    
+    window = np.hanning(n_fft)
+    padded = np.pad(np.asarray(data, dtype=np.float64), (n_fft // 2, n_fft // 2 + hop))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop] * window
+    spectrum = np.fft.rfft(frames, axis=1)
+    
+    # Analysis positions of the stretched frames, interpolated between input frames
+    steps = np.arange(0, len(spectrum) - 1, 1.0 / ratio)
+    index = steps.astype(int)
+    frac = (steps - index)[:, None]
+    left, right = spectrum[index], spectrum[index + 1]
+    magnitude = (1 - frac) * np.abs(left) + frac * np.abs(right)
+    
+    # Accumulate the true phase advance of every bin across frames
+    omega = 2 * np.pi * hop * np.arange(spectrum.shape[1]) / n_fft
+    delta = np.angle(right) - np.angle(left) - omega
+    delta -= 2 * np.pi * np.round(delta / (2 * np.pi))
+    advance = omega + delta
+    phase = np.angle(spectrum[0]) + np.vstack([np.zeros_like(omega), np.cumsum(advance[:-1], axis=0)])
+    
+    # Overlap-add the resynthesized frames
+    out_frames = np.fft.irfft(magnitude * np.exp(1j * phase), n=n_fft, axis=1) * window
+    positions = (np.arange(len(out_frames)) * hop)[:, None] + np.arange(n_fft)
+    length = positions[-1, -1] + 1
+    stretched = np.zeros(length)
+    norm = np.zeros(length)
+    np.add.at(stretched, positions, out_frames)
+    np.add.at(norm, positions, np.broadcast_to(window ** 2, out_frames.shape))
+    stretched = stretched / np.maximum(norm, 1e-8)
+    stretched = stretched[n_fft // 2:n_fft // 2 + int(round(len(data) * ratio))]
+    
+    # Back to the original length: the stretch becomes a pitch shift
+    return signal.resample(stretched, len(data)).astype(np.float32)
+
+_worker_sound = None  # (data, sr, pitch_mode) of the process pool worker
+
+def _render_note(data, sr, pitch_mode, note):
+    """Render one pitched variant."""
+    if pitch_mode == 'phase_vocoder':
+        return np.asarray(pitch_shift(data, sr, target_note=note), dtype=np.float32)
+    return np.asarray(resample(data, sr, target_note=note), dtype=np.float32)
+
+def _init_worker(data, sr, pitch_mode):
+    """Process pool initializer: receive the sound once per worker."""
+    global _worker_sound
+    _worker_sound = (data, sr, pitch_mode)
+
+def _render_worker_note(note):
+    """Render one pitched variant of the worker's sound (process pool worker)."""
+    return _render_note(*_worker_sound, note)
+
+def render_variants(data, sr, notes, pitch_mode='resample', workers=None):
+    """
+    Render pitched variants of a sound for a range of notes in parallel.
+    
+    Args:
+        data: Audio data
+        sr: Sample rate
+        notes: Iterable of MIDI notes
+        pitch_mode: 'resample' (changes duration) or 'phase_vocoder'
+            (keeps duration)
+        workers: Number of worker processes (default=None, one per CPU;
+            1 renders in the calling process)
+        
+    Returns:
+        {note: float32 data}
+    """
+    if pitch_mode not in PITCH_MODES:
+        raise ValueError(f"Unknown pitch mode: {pitch_mode}")
+    
+    notes = list(notes)
+    data = np.asarray(data, dtype=np.float32)
+    if workers == 1 or len(notes) < 2:
+        return {note: _render_note(data, sr, pitch_mode, note) for note in notes}
+    
+    # The sound goes to each worker once, so only note numbers are sent per task
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data, sr, pitch_mode)) as pool:
+        return dict(zip(notes, pool.map(_render_worker_note, notes)))
+
+def read_mono(filepath):
+    """
+    Read a sound file as mono float32.
+    
+    Args:
+        filepath: Path to sound file
+        
+    Returns:
+        (data, sample_rate)
+    """
+    data, sr = sf.read(filepath, dtype='float32')
+    
+    # Convert stereo to mono if needed
+    if len(data.shape) > 1 and data.shape[1] > 1:
+        data = np.mean(data, axis=1)
+    
+    return data, sr
+
 def load_pipewire_device(device_id=8, in_channels=64, out_channels=64):
     """
     Helper function to setup PipeWire device.